@@ -8,11 +8,58 @@ import sqlite3
 import pandas as pd
 import numpy as np
 import time
-from collections import Counter
+import hashlib
+import itertools
 
 # --- Configuration ---
 DB_PATH = "../../data/arxiv_papers.db"
 
+def content_hash(array, digest_size=8):
+    """Fast content hash of an array (bytes + shape) for use in cache filenames."""
+    array = np.ascontiguousarray(array)
+    h = hashlib.blake2b(array.view(np.uint8), digest_size=digest_size)
+    h.update(str(array.shape).encode())
+    return h.hexdigest()
+
+def paper_index(paper_ids):
+    """paper_id -> position in paper_ids, as a pandas Series (supports [pid] and `in`)."""
+    return pd.Series(np.arange(len(paper_ids), dtype=np.int64), index=pd.Index(paper_ids, name='paper_id'))
+
+def stage_paper_index(con, table, paper_ids):
+    """Create TEMP table `table`(paper_id, idx) mapping each paper_id to its position in paper_ids."""
+    con.execute(f"DROP TABLE IF EXISTS temp.{table}")
+    con.execute(f"CREATE TEMP TABLE {table}(paper_id TEXT PRIMARY KEY, idx INTEGER NOT NULL) WITHOUT ROWID")
+    con.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?, ?)", zip(paper_ids, range(len(paper_ids))))
+
+def fetch_index_pairs(cursor, n_rows=None, chunk_size=1_000_000):
+    """
+    Read (src_idx, dst_idx) integer rows from a cursor into two int64 arrays.
+    
+    Rows are fetched chunk_size at a time, so only one chunk of Python tuples exists
+    at once. With n_rows (an upper bound) the arrays are preallocated and filled in
+    place; otherwise the chunks are concatenated at the end.
+    """
+    if n_rows is not None:
+        src = np.empty(n_rows, dtype=np.int64)
+        dst = np.empty(n_rows, dtype=np.int64)
+    chunks = []
+    offset = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        block = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+        if n_rows is not None:
+            src[offset:offset + len(block)] = block[:, 0]
+            dst[offset:offset + len(block)] = block[:, 1]
+        else:
+            chunks.append(block)
+        offset += len(block)
+    if n_rows is not None:
+        return src[:offset], dst[:offset]
+    block = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    return np.ascontiguousarray(block[:, 0]), np.ascontiguousarray(block[:, 1])
+
 def load_graph_from_db():
     """Load the filtered citation graph from the database."""
     print("Loading filtered citation graph from database...")
@@ -21,20 +68,43 @@ def load_graph_from_db():
     # Load filtered papers
     papers_df = pd.read_sql_query("SELECT paper_id FROM filtered_papers", con)
     paper_ids = papers_df['paper_id'].tolist()
-    paper_to_idx = {pid: idx for idx, pid in enumerate(paper_ids)}
-    
-    # Load filtered citations
-    citations_df = pd.read_sql_query("SELECT src, dst FROM filtered_citations", con)
-    
-    # Convert to indices
-    src_indices = [paper_to_idx[pid] for pid in citations_df['src']]
-    dst_indices = [paper_to_idx[pid] for pid in citations_df['dst']]
+    paper_to_idx = paper_index(paper_ids)
     
+    # Load filtered citations as indices: the id -> index join runs inside SQLite against
+    # a temp index table, so no paper_id strings are materialized on the Python side
+    stage_paper_index(con, "paper_idx", paper_ids)
+    n_citations = con.execute("SELECT COUNT(*) FROM filtered_citations").fetchone()[0]
+    cursor = con.execute("""
+        SELECT COALESCE(s.idx, -1), COALESCE(d.idx, -1) FROM filtered_citations c
+        LEFT JOIN paper_idx s ON c.src = s.paper_id
+        LEFT JOIN paper_idx d ON c.dst = d.paper_id
+    """)
+    src_indices, dst_indices = fetch_index_pairs(cursor, n_citations)
     con.close()
     
+    if (src_indices < 0).any() or (dst_indices < 0).any():
+        raise KeyError("filtered_citations references papers missing from filtered_papers")
+    
     print(f"Loaded {len(paper_ids)} filtered papers and {len(src_indices)} filtered citations")
     return paper_ids, paper_to_idx, src_indices, dst_indices
 
+def load_citations_within(con, paper_ids):
+    """
+    Load citations whose endpoints are both in paper_ids, as indices into paper_ids.
+    
+    The subset is staged in a temp index table and INNER JOINed, and indices follow
+    the order of paper_ids so they match paper_index(paper_ids).
+    """
+    stage_paper_index(con, "subset_papers", paper_ids)
+    cursor = con.execute("""
+        SELECT s.idx, d.idx FROM filtered_citations c
+        JOIN subset_papers s ON c.src = s.paper_id
+        JOIN subset_papers d ON c.dst = d.paper_id
+    """)
+    src_indices, dst_indices = fetch_index_pairs(cursor)
+    con.execute("DROP TABLE subset_papers")
+    return src_indices, dst_indices
+
 def load_subset_for_debug(max_papers=1000):
     """Load a small subset of the graph for debugging purposes."""
     print(f"Loading subset of {max_papers} papers for debugging...")
@@ -47,28 +117,11 @@ def load_subset_for_debug(max_papers=1000):
         con, params=(max_papers,)
     )
     paper_ids = papers_df['paper_id'].tolist()
-    paper_to_idx = {pid: idx for idx, pid in enumerate(paper_ids)}
-    paper_set = set(paper_ids)
+    paper_to_idx = paper_index(paper_ids)
     
     # Load only citations within this subset
     print("   Loading citations within subset...")
-    citations_query = """
-        SELECT src, dst FROM filtered_citations 
-        WHERE src IN ({}) AND dst IN ({})
-    """.format(
-        ','.join(['?'] * len(paper_set)),
-        ','.join(['?'] * len(paper_set))
-    )
-    
-    subset_citations = pd.read_sql_query(
-        citations_query, 
-        con, 
-        params=list(paper_set) + list(paper_set)
-    )
-    
-    # Convert to indices
-    src_indices = [paper_to_idx[pid] for pid in subset_citations['src'] if pid in paper_to_idx]
-    dst_indices = [paper_to_idx[pid] for pid in subset_citations['dst'] if pid in paper_to_idx]
+    src_indices, dst_indices = load_citations_within(con, paper_ids)
     
     con.close()
     
@@ -102,146 +155,141 @@ def load_subset_for_debug_by_degree(max_papers=1000):
     """
     papers_df = pd.read_sql_query(degree_query, con, params=(max_papers,))
     paper_ids = papers_df['paper_id'].tolist()
-    paper_to_idx = {pid: idx for idx, pid in enumerate(paper_ids)}
-    paper_set = set(paper_ids)
+    paper_to_idx = paper_index(paper_ids)
     
     # Load citations within this subset
     print("   Loading citations within subset...")
-    citations_query = """
-        SELECT src, dst FROM filtered_citations 
-        WHERE src IN ({}) AND dst IN ({})
-    """.format(
-        ','.join(['?'] * len(paper_set)),
-        ','.join(['?'] * len(paper_set))
-    )
-    
-    subset_citations = pd.read_sql_query(
-        citations_query, 
-        con, 
-        params=list(paper_set) + list(paper_set)
-    )
-    
-    # Convert to indices
-    src_indices = [paper_to_idx[pid] for pid in subset_citations['src'] if pid in paper_to_idx]
-    dst_indices = [paper_to_idx[pid] for pid in subset_citations['dst'] if pid in paper_to_idx]
+    src_indices, dst_indices = load_citations_within(con, paper_ids)
     
     con.close()
     
     print(f"Loaded {len(paper_ids)} papers and {len(src_indices)} citations for debugging")
     return paper_ids, paper_to_idx, src_indices, dst_indices
 
+# Columns written by save_results_to_db
+RESULT_COLUMNS = [
+    ("embedding_x", "REAL"),
+    ("embedding_y", "REAL"),
+    ("cluster_id", "INTEGER"),
+    ("cluster_size", "INTEGER"),
+    ("processed_date", "TEXT")
+]
+
+def open_write_connection(db_path=DB_PATH, timeout=30.0):
+    """Open a connection configured once for bulk writes."""
+    con = sqlite3.connect(db_path, timeout=timeout)
+    
+    # Set pragmas for better concurrency
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA temp_store=memory")
+    con.execute("PRAGMA mmap_size=268435456")  # 256MB
+    return con
+
+def ensure_result_columns(con, table="filtered_papers"):
+    """
+    Add any missing result columns, checking the schema once instead of probing with ALTER,
+    and make sure paper_id is indexed so the bulk UPDATE joins by index lookups.
+    """
+    existing = {row[1] for row in con.execute(f"PRAGMA table_info({table})")}
+    for col_name, col_type in RESULT_COLUMNS:
+        if col_name not in existing:
+            con.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type}")
+            print(f"✅ Added column: {col_name}")
+    # filtered_papers is built with CREATE TABLE AS, so it has no key on paper_id
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_paper_id ON {table}(paper_id)")
+
 def save_results_to_db(paper_ids, embeddings_2d, cluster_labels):
     """Save clustering results and 2D embeddings to the database."""
     print("Saving results to database...")
     
     max_retries = 3
     
-    for attempt in range(max_retries):
-        try:
-            con = sqlite3.connect("../../data/arxiv_papers.db", timeout=30.0)
-            
-            # Set pragmas for better concurrency
-            con.execute("PRAGMA journal_mode=WAL")
-            con.execute("PRAGMA synchronous=NORMAL")
-            con.execute("PRAGMA temp_store=memory")
-            con.execute("PRAGMA mmap_size=268435456")  # 256MB
-            
-            # Add columns if they don't exist (handle gracefully if they already exist)
-            columns_to_add = [
-                ("embedding_x", "REAL"),
-                ("embedding_y", "REAL"),
-                ("cluster_id", "INTEGER"),
-                ("cluster_size", "INTEGER"),
-                ("processed_date", "TEXT")
-            ]
-            
-            for col_name, col_type in columns_to_add:
-                try:
-                    con.execute(f"ALTER TABLE filtered_papers ADD COLUMN {col_name} {col_type}")
-                    print(f"✅ Added column: {col_name}")
-                except sqlite3.OperationalError as e:
-                    if "duplicate column name" in str(e).lower():
-                        pass  # Column already exists, which is fine
-                    else:
-                        print(f"⚠️  Could not add column {col_name}: {e}")
-            
-            # Calculate cluster sizes
-            cluster_sizes = Counter(cluster_labels)
-            
-            # Update the filtered_papers table with results
-            print(f"📝 Updating {len(paper_ids)} papers with clustering results...")
-            
-            # Verify array dimensions match
-            if len(paper_ids) != len(embeddings_2d) or len(paper_ids) != len(cluster_labels):
-                print(f"⚠️  Array size mismatch:")
-                print(f"   paper_ids: {len(paper_ids)}")
-                print(f"   embeddings_2d: {len(embeddings_2d)}")
-                print(f"   cluster_labels: {len(cluster_labels)}")
-                print("   Using minimum size for safety...")
-                min_size = min(len(paper_ids), len(embeddings_2d), len(cluster_labels))
-                paper_ids = paper_ids[:min_size]
-            
-            # Use batch updates for better performance
-            batch_size = 1000
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-            
-            for i in range(0, len(paper_ids), batch_size):
-                batch_end = min(i + batch_size, len(paper_ids))
-                batch_updates = []
+    # Verify array dimensions match
+    if len(paper_ids) != len(embeddings_2d) or len(paper_ids) != len(cluster_labels):
+        print(f"⚠️  Array size mismatch:")
+        print(f"   paper_ids: {len(paper_ids)}")
+        print(f"   embeddings_2d: {len(embeddings_2d)}")
+        print(f"   cluster_labels: {len(cluster_labels)}")
+        print("   Using minimum size for safety...")
+        min_size = min(len(paper_ids), len(embeddings_2d), len(cluster_labels))
+        paper_ids = paper_ids[:min_size]
+    
+    # Per-row columns built once with array ops; cluster size is a gather from a
+    # bincount histogram (labels shifted by one so a noise label -1 uses bin 0)
+    n_rows = len(paper_ids)
+    all_labels = np.asarray(cluster_labels, dtype=np.int64)
+    cluster_sizes = np.bincount(all_labels + 1)
+    labels = all_labels[:n_rows]
+    columns = (
+        list(paper_ids),
+        np.asarray(embeddings_2d[:n_rows, 0], dtype=np.float64).tolist(),
+        np.asarray(embeddings_2d[:n_rows, 1], dtype=np.float64).tolist(),
+        labels.tolist(),
+        cluster_sizes[labels + 1].tolist(),
+    )
+    
+    # Connection and pragmas are set up once and reused across retries
+    con = open_write_connection()
+    con.execute("PRAGMA cache_size=-200000")  # ~200MB page cache for the bulk write
+    
+    try:
+        for attempt in range(max_retries):
+            try:
+                ensure_result_columns(con)
+                
+                # Update the filtered_papers table with results
+                print(f"📝 Updating {len(paper_ids)} papers with clustering results...")
                 
-                for j in range(i, batch_end):
-                    paper_id = paper_ids[j]
-                    cluster_id = int(cluster_labels[j])
-                    cluster_size = cluster_sizes[cluster_id]
-                    
-                    batch_updates.append((
-                        float(embeddings_2d[j, 0]), 
-                        float(embeddings_2d[j, 1]), 
-                        cluster_id,
-                        cluster_size,
-                        current_time,
-                        paper_id
-                    ))
+                # Stage all new values in a temp table, then apply them with one UPDATE ... FROM
+                current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+                rows = zip(*columns, itertools.repeat(current_time))
                 
-                con.executemany("""
+                # Take the write lock up front so the whole write is one transaction
+                con.execute("BEGIN IMMEDIATE")
+                con.execute("DROP TABLE IF EXISTS temp.updates")
+                con.execute("""
+                    CREATE TEMP TABLE updates(
+                        paper_id TEXT PRIMARY KEY, ex REAL, ey REAL, cid INTEGER, csize INTEGER, pd TEXT
+                    )
+                """)
+                con.executemany("INSERT INTO updates VALUES (?, ?, ?, ?, ?, ?)", rows)
+                con.execute("""
                     UPDATE filtered_papers 
-                    SET embedding_x = ?, embedding_y = ?, cluster_id = ?, 
-                        cluster_size = ?, processed_date = ?
-                    WHERE paper_id = ?
-                """, batch_updates)
+                    SET embedding_x = updates.ex, embedding_y = updates.ey, cluster_id = updates.cid, 
+                        cluster_size = updates.csize, processed_date = updates.pd
+                    FROM updates
+                    WHERE filtered_papers.paper_id = updates.paper_id
+                """)
+                con.execute("DROP TABLE updates")
                 
-                if (i // batch_size + 1) % 10 == 0:
-                    print(f"   📝 Processed {batch_end:,}/{len(paper_ids):,} papers...")
-            
-            con.commit()
-            print(f"✅ Successfully saved results for {len(paper_ids):,} papers to database")
-            
-            # Verify the save
-            result = con.execute("SELECT COUNT(*) FROM filtered_papers WHERE cluster_id IS NOT NULL").fetchone()
-            saved_count = result[0] if result else 0
-            print(f"✅ Verification: {saved_count:,} papers now have clustering results")
-            
-            con.close()
-            return True
-            
-        except sqlite3.OperationalError as e:
-            if "database is locked" in str(e).lower() and attempt < max_retries - 1:
-                print(f"⚠️  Database locked, retrying in {2 ** attempt} seconds... (attempt {attempt + 1}/{max_retries})")
-                time.sleep(2 ** attempt)
-                continue
-            else:
-                print(f"❌ Failed to save to database: {e}")
+                con.execute("COMMIT")
+                print(f"✅ Successfully saved results for {len(paper_ids):,} papers to database")
+                
+                # Verify the save
+                result = con.execute("SELECT COUNT(*) FROM filtered_papers WHERE cluster_id IS NOT NULL").fetchone()
+                saved_count = result[0] if result else 0
+                print(f"✅ Verification: {saved_count:,} papers now have clustering results")
+                
+                return True
+                
+            except sqlite3.OperationalError as e:
+                if con.in_transaction:
+                    con.rollback()
+                if "database is locked" in str(e).lower() and attempt < max_retries - 1:
+                    print(f"⚠️  Database locked, retrying in {2 ** attempt} seconds... (attempt {attempt + 1}/{max_retries})")
+                    time.sleep(2 ** attempt)
+                    continue
+                else:
+                    print(f"❌ Failed to save to database: {e}")
+                    return False
+            except Exception as e:
+                print(f"❌ Unexpected error saving to database: {e}")
+                import traceback
+                traceback.print_exc()
                 return False
-        except Exception as e:
-            print(f"❌ Unexpected error saving to database: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-        finally:
-            try:
-                con.close()
-            except:
-                pass
+    finally:
+        con.close()
     
     print(f"❌ Failed to save to database after {max_retries} attempts")
     return False
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+🔗 Numba DBSCAN for the CPU clustering fallback
+
+Used by PhysicsClusteringMigrator when hdbscan is not installed. Neighbour pairs
+within eps come from one SciPy cKDTree query as an int array (no per-point
+Python lists); cluster expansion is a JIT-compiled stack traversal over the CSR
+core-point graph. Labels follow scikit-learn's DBSCAN semantics: a point's
+neighbourhood includes itself and noise is -1.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from numba import njit
+from scipy.spatial import cKDTree
+
+
+@njit(cache=True)
+def _expand_clusters(indptr, indices, is_core):
+    """Label connected components of core points; border points join the first cluster reaching them."""
+    n = is_core.shape[0]
+    labels = np.full(n, -1, np.int32)
+    stack = np.empty(n, np.int32)
+    cluster = 0
+    for seed in range(n):
+        if not is_core[seed] or labels[seed] != -1:
+            continue
+        labels[seed] = cluster
+        stack[0] = seed
+        top = 1
+        while top > 0:
+            top -= 1
+            i = stack[top]
+            for p in range(indptr[i], indptr[i + 1]):
+                j = indices[p]
+                if labels[j] == -1:
+                    labels[j] = cluster
+                    if is_core[j]:
+                        stack[top] = j
+                        top += 1
+        cluster += 1
+    return labels
+
+
+def dbscan(positions: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+    """
+    DBSCAN labels for (N, d) points; -1 marks noise.
+    """
+    n = len(positions)
+    pairs = cKDTree(positions).query_pairs(eps, output_type='ndarray')
+    graph = sp.coo_matrix(
+        (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n)
+    )
+    graph = (graph + graph.T).tocsr()
+    indptr = graph.indptr.astype(np.int64)
+    indices = graph.indices.astype(np.int32)
+    is_core = np.diff(indptr) + 1 >= min_samples
+    return _expand_clusters(indptr, indices, is_core)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+🧲 Numba Barnes-Hut ForceAtlas2 for the CPU layout fallback
+
+Used by PhysicsClusteringMigrator when RAPIDS is not available. Repulsion is
+approximated with a quadtree kept in flat arrays and rebuilt every iteration
+(O(N log N)); attraction walks a symmetric CSR adjacency row by row, so every
+vertex only writes its own force and no atomics are needed. Vertices are
+processed in parallel blocks of BLOCK_SIZE so each thread's working set stays
+in cache. Speed adaptation follows Gephi's ForceAtlas2, including LinLog mode.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+BLOCK_SIZE = 1024      # vertices per parallel work item
+MAX_DEPTH = 40         # coincident points stop splitting here and share a leaf
+
+
+@njit(cache=True)
+def _build_quadtree(x, y, mass, capacity):
+    """
+    Insert all points into a quadtree stored in flat arrays.
+
+    Returns the tree arrays and the number of nodes used, or -1 as the node
+    count if capacity was too small (the caller retries with a larger one).
+    """
+    child = np.full((capacity, 4), -1, np.int32)
+    body = np.full(capacity, -1, np.int32)
+    internal = np.zeros(capacity, np.bool_)
+    node_mass = np.zeros(capacity, np.float64)
+    com_x = np.zeros(capacity, np.float64)
+    com_y = np.zeros(capacity, np.float64)
+    center_x = np.zeros(capacity, np.float64)
+    center_y = np.zeros(capacity, np.float64)
+    half = np.zeros(capacity, np.float64)
+
+    x_min, x_max, y_min, y_max = x.min(), x.max(), y.min(), y.max()
+    center_x[0] = 0.5 * (x_min + x_max)
+    center_y[0] = 0.5 * (y_min + y_max)
+    half[0] = 0.5 * max(x_max - x_min, y_max - y_min) + 1e-9
+    count = 1
+
+    for i in range(x.shape[0]):
+        node = 0
+        depth = 0
+        while True:
+            if internal[node]:
+                # Accumulate mass and mass-weighted position, then descend
+                node_mass[node] += mass[i]
+                com_x[node] += mass[i] * x[i]
+                com_y[node] += mass[i] * y[i]
+                q = (x[i] >= center_x[node]) + 2 * (y[i] >= center_y[node])
+                c = child[node, q]
+                if c == -1:
+                    if count == capacity:
+                        return child, body, internal, node_mass, com_x, com_y, half, -1
+                    c = count
+                    count += 1
+                    child[node, q] = c
+                    half[c] = 0.5 * half[node]
+                    center_x[c] = center_x[node] + (half[c] if q & 1 else -half[c])
+                    center_y[c] = center_y[node] + (half[c] if q & 2 else -half[c])
+                node = c
+                depth += 1
+                continue
+
+            if body[node] == -1 or depth >= MAX_DEPTH:
+                # Empty leaf, or a max-depth leaf shared by coincident points
+                if body[node] == -1:
+                    body[node] = i
+                node_mass[node] += mass[i]
+                com_x[node] += mass[i] * x[i]
+                com_y[node] += mass[i] * y[i]
+                break
+
+            # Occupied leaf: move its body one level down and retry as an internal node
+            if count == capacity:
+                return child, body, internal, node_mass, com_x, com_y, half, -1
+            j = body[node]
+            body[node] = -1
+            internal[node] = True
+            q = (x[j] >= center_x[node]) + 2 * (y[j] >= center_y[node])
+            c = count
+            count += 1
+            child[node, q] = c
+            half[c] = 0.5 * half[node]
+            center_x[c] = center_x[node] + (half[c] if q & 1 else -half[c])
+            center_y[c] = center_y[node] + (half[c] if q & 2 else -half[c])
+            body[c] = j
+            node_mass[c] = mass[j]
+            com_x[c] = mass[j] * x[j]
+            com_y[c] = mass[j] * y[j]
+
+    for k in range(count):
+        if node_mass[k] > 0.0:
+            com_x[k] /= node_mass[k]
+            com_y[k] /= node_mass[k]
+
+    return child, body, internal, node_mass, com_x, com_y, half, count
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _compute_forces(x, y, mass, indptr, indices, child, internal, node_mass, com_x, com_y, half,
+                    scaling_ratio, gravity, theta, lin_log, fx, fy):
+    """Repulsion (Barnes-Hut), attraction (CSR) and gravity for every vertex."""
+    n = x.shape[0]
+    n_blocks = (n + BLOCK_SIZE - 1) // BLOCK_SIZE
+    theta2 = theta * theta
+
+    for b in prange(n_blocks):
+        stack = np.empty(4 * MAX_DEPTH + 8, np.int32)
+        for i in range(b * BLOCK_SIZE, min(n, (b + 1) * BLOCK_SIZE)):
+            xi = x[i]
+            yi = y[i]
+            mi = mass[i]
+            f_x = 0.0
+            f_y = 0.0
+
+            # Repulsion: open a cell while its width / distance >= theta
+            stack[0] = 0
+            top = 1
+            while top > 0:
+                top -= 1
+                k = stack[top]
+                if node_mass[k] == 0.0:
+                    continue
+                dx = xi - com_x[k]
+                dy = yi - com_y[k]
+                d2 = dx * dx + dy * dy
+                if internal[k] and 4.0 * half[k] * half[k] >= theta2 * d2:
+                    for q in range(4):
+                        c = child[k, q]
+                        if c != -1:
+                            stack[top] = c
+                            top += 1
+                    continue
+                if d2 < 1e-12:
+                    continue  # the vertex itself (or a coincident point)
+                f = scaling_ratio * mi * node_mass[k] / d2
+                f_x += dx * f
+                f_y += dy * f
+
+            # Attraction along edges (each undirected edge is stored in both rows)
+            for p in range(indptr[i], indptr[i + 1]):
+                j = indices[p]
+                dx = xi - x[j]
+                dy = yi - y[j]
+                d = np.sqrt(dx * dx + dy * dy)
+                if d > 0.0:
+                    f = np.log(1.0 + d) / d if lin_log else 1.0
+                    f_x -= dx * f
+                    f_y -= dy * f
+
+            # Gravity towards the origin
+            d = np.sqrt(xi * xi + yi * yi)
+            if d > 0.0:
+                f = gravity * mi / d
+                f_x -= xi * f
+                f_y -= yi * f
+
+            fx[i] = f_x
+            fy[i] = f_y
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _apply_forces(x, y, mass, fx, fy, old_fx, old_fy, speed, speed_efficiency, jitter_tolerance):
+    """Gephi's adaptive global speed, then move every vertex by its local speed."""
+    n = x.shape[0]
+    total_swing = 0.0
+    total_traction = 0.0
+    for i in prange(n):
+        sx = fx[i] - old_fx[i]
+        sy = fy[i] - old_fy[i]
+        tx = fx[i] + old_fx[i]
+        ty = fy[i] + old_fy[i]
+        total_swing += mass[i] * np.sqrt(sx * sx + sy * sy)
+        total_traction += 0.5 * mass[i] * np.sqrt(tx * tx + ty * ty)
+
+    estimated_jitter = 0.05 * np.sqrt(n)
+    jt = jitter_tolerance * max(np.sqrt(estimated_jitter),
+                                min(10.0, estimated_jitter * total_traction / (n * n)))
+    min_speed_efficiency = 0.05
+    if total_traction > 0.0 and total_swing / total_traction > 2.0:
+        if speed_efficiency > min_speed_efficiency:
+            speed_efficiency *= 0.5
+        jt = max(jt, jitter_tolerance)
+
+    target_speed = jt * speed_efficiency * total_traction / total_swing if total_swing > 0.0 else speed
+    if total_swing > jt * total_traction:
+        if speed_efficiency > min_speed_efficiency:
+            speed_efficiency *= 0.7
+    elif speed < 1000.0:
+        speed_efficiency *= 1.3
+    speed = speed + min(target_speed - speed, 0.5 * speed)
+
+    for i in prange(n):
+        sx = fx[i] - old_fx[i]
+        sy = fy[i] - old_fy[i]
+        swing = mass[i] * np.sqrt(sx * sx + sy * sy)
+        factor = speed / (1.0 + np.sqrt(speed * swing))
+        x[i] += fx[i] * factor
+        y[i] += fy[i] * factor
+
+    return speed, speed_efficiency
+
+
+def forceatlas2_layout(adjacency, iterations: int = 1000, scaling_ratio: float = 2.0,
+                       gravity: float = 1.0, theta: float = 1.2, lin_log: bool = True,
+                       jitter_tolerance: float = 1.0, seed: int = 42) -> np.ndarray:
+    """
+    Run ForceAtlas2 on a symmetric scipy sparse adjacency matrix.
+
+    Returns (N, 2) float32 positions in row order of the adjacency matrix.
+    Vertex mass is degree + 1, as in Gephi.
+    """
+    adjacency = adjacency.tocsr()
+    n = adjacency.shape[0]
+    indptr = adjacency.indptr.astype(np.int64)
+    indices = adjacency.indices.astype(np.int32)
+    mass = np.diff(indptr).astype(np.float64) + 1.0
+
+    rng = np.random.default_rng(seed)
+    x = rng.random(n)
+    y = rng.random(n)
+    fx = np.zeros(n)
+    fy = np.zeros(n)
+    old_fx = np.zeros(n)
+    old_fy = np.zeros(n)
+    speed, speed_efficiency = 1.0, 1.0
+    capacity = 4 * n + 64
+
+    for _ in range(iterations):
+        while True:
+            child, _body, internal, node_mass, com_x, com_y, half, count = _build_quadtree(x, y, mass, capacity)
+            if count >= 0:
+                break
+            capacity *= 2
+
+        old_fx, fx = fx, old_fx
+        old_fy, fy = fy, old_fy
+        _compute_forces(x, y, mass, indptr, indices, child, internal, node_mass, com_x, com_y, half,
+                        scaling_ratio, gravity, theta, lin_log, fx, fy)
+        speed, speed_efficiency = _apply_forces(x, y, mass, fx, fy, old_fx, old_fy,
+                                                speed, speed_efficiency, jitter_tolerance)
+
+    return np.column_stack((x, y)).astype(np.float32)
@@ -4,11 +4,16 @@ Clustering algorithms with GPU/CPU support and caching.
 Supports K-means with automatic optimal k detection and various backends.
 """
 
+import glob
 import numpy as np
 import os
-from sklearn.cluster import KMeans
+import re
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import silhouette_score
-from kneed import KneeLocator
+from data_loader import content_hash
 
 # Try to import GPU libraries
 try:
@@ -21,6 +26,7 @@ except ImportError:
 
 try:
     from cuml.cluster import KMeans as cuKMeans
+    from cuml.metrics.cluster import silhouette_score as cu_silhouette_score
     import cupy as cp
     CUML_AVAILABLE = True
     print("✅ cuML found – GPU K-means enabled")
@@ -28,8 +34,28 @@ except ImportError:
     CUML_AVAILABLE = False
     print("⚠️  cuML not available")
 
+try:
+    from cuvs.cluster import kmeans as cuvs_kmeans
+    import cupy as cp
+    CUVS_AVAILABLE = True
+    print("✅ cuVS found – fused GPU K-means enabled")
+except ImportError:
+    CUVS_AVAILABLE = False
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 def kmeans_pytorch(embeddings, n_clusters, max_iter=300, tol=1e-4, random_state=42):
-    """Fast PyTorch-based K-means implementation with proper seeding."""
+    """
+    Fast PyTorch-based K-means implementation with proper seeding.
+    
+    Returns:
+        (labels, centroids, inertia) with labels/centroids as NumPy arrays and
+        inertia computed on-device from the final assignment step.
+    """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     
     # Show device info
@@ -41,11 +67,15 @@ def kmeans_pytorch(embeddings, n_clusters, max_iter=300, tol=1e-4, random_state=
     
     # Convert to PyTorch tensor
     X = torch.tensor(embeddings, dtype=torch.float32, device=device)
+    return kmeans_pytorch_on_device(X, n_clusters, max_iter, tol, random_state)
+
+def kmeans_pytorch_on_device(X, n_clusters, max_iter=300, tol=1e-4, random_state=42):
+    """K-means on a float32 tensor already resident on its target device."""
     N, D = X.shape
     
     # Set random seed for reproducible results
     torch.manual_seed(random_state)
-    if device.type == "cuda":
+    if X.device.type == "cuda":
         torch.cuda.manual_seed(random_state)
     
     # Use K-means++ initialization for better convergence
@@ -56,7 +86,7 @@ def kmeans_pytorch(embeddings, n_clusters, max_iter=300, tol=1e-4, random_state=
         distances = torch.sum((X.unsqueeze(1) - centroids.unsqueeze(0)) ** 2, dim=2)
         
         # Assign points to closest centroids
-        labels = torch.argmin(distances, dim=1)
+        min_distances, labels = torch.min(distances, dim=1)
         
         # Update centroids
         new_centroids = torch.zeros_like(centroids)
@@ -75,10 +105,10 @@ def kmeans_pytorch(embeddings, n_clusters, max_iter=300, tol=1e-4, random_state=
             
         centroids = new_centroids
     
-    if device.type == "cuda":
-        torch.cuda.synchronize()  # Ensure all GPU operations complete
+    # Inertia from the final assignment step (already computed on-device)
+    inertia = min_distances.sum().item()
     
-    return labels.cpu().numpy()
+    return labels.cpu().numpy(), centroids.cpu().numpy(), inertia
 
 def kmeans_plus_plus_init(X, n_clusters, random_state):
     """K-means++ initialization for better convergence."""
@@ -107,87 +137,287 @@ def kmeans_plus_plus_init(X, n_clusters, random_state):
     
     return centroids
 
+# The elbow only needs the shape of the inertia curve, so the k-sweep runs on a
+# uniform sample of at most this many rows
+ELBOW_SAMPLE_SIZE = 100_000
+
+# The exact silhouette score is O(N^2), so it is estimated on this many rows
+SILHOUETTE_SAMPLE_SIZE = 20_000
+
+def elbow_sample(embeddings, sample_size=ELBOW_SAMPLE_SIZE, random_state=42):
+    """Uniform random float32 sample of rows (all rows, in order, if there are few enough)."""
+    if len(embeddings) <= sample_size:
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    rng = np.random.default_rng(random_state)
+    idx = np.sort(rng.choice(len(embeddings), size=sample_size, replace=False))
+    return np.ascontiguousarray(embeddings[idx], dtype=np.float32)
+
+def _kmeans_inertia_cpu(embeddings, k, n_threads):
+    """Single mini-batch K-means fit for one k, limited to n_threads BLAS/OpenMP threads."""
+    with threadpool_limits(limits=n_threads):
+        kmeans = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=3, init='k-means++',
+                                 batch_size=4096, max_iter=100)
+        kmeans.fit(embeddings)
+    return kmeans.inertia_
+
+def inertia_backend():
+    """Estimator _measure_inertias uses here: "gpu" (full Lloyd) or "cpu" (mini-batch)."""
+    return "gpu" if TORCH_AVAILABLE and torch.cuda.is_available() else "cpu"
+
+def elbow_cache_file(embeddings_hash, backend):
+    """Elbow inertia cache; keyed by backend so curves never mix the two estimators."""
+    return f"elbow_k_inertias_{backend}_s{ELBOW_SAMPLE_SIZE}_{embeddings_hash}.npz"
+
+def _measure_inertias(sample, ks):
+    """K-means inertia on the elbow sample for each k in ks (GPU when available)."""
+    if inertia_backend() == "gpu":
+        # Push once and reuse the device tensor across the whole batch
+        print(f"   🚀 Using GPU: {torch.cuda.get_device_name()}")
+        X_gpu = to_device_tensor(sample)
+        
+        inertias = []
+        for k in ks:
+            print(f"   Testing k={k}...", flush=True)
+            # Multiple runs with different seeds for stability
+            _, best_inertia = perform_clustering_on_device(X_gpu, k)
+            inertias.append(best_inertia)
+        return inertias
+    
+    # The fits are independent: run scikit-learn fits in worker processes, each with
+    # a small thread pool to avoid oversubscription. joblib memory-maps large arrays
+    # instead of copying them into every worker.
+    threads_per_job = 4
+    n_jobs = max(1, min(len(ks), (os.cpu_count() or 1) // threads_per_job))
+    print(f"   💻 Running {len(ks)} CPU K-means fits ({', '.join(map(str, ks))}) across {n_jobs} workers...", flush=True)
+    return Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(_kmeans_inertia_cpu)(sample, k, threads_per_job) for k in ks
+    )
+
+# New k values measured per bracketing round of the elbow search
+ELBOW_PROBES = 3
+
 def find_optimal_k_elbow(embeddings, k_range=(5, 50), use_cache=True):
-    """Find optimal number of clusters using elbow method with consistent initialization."""
-    cache_file = f"elbow_search_k{k_range[0]}-{k_range[1]}_papers{len(embeddings)}.npy"
+    """
+    Find optimal number of clusters using elbow method with consistent initialization.
+    
+    The elbow is the k whose inertia lies furthest below the chord between the
+    two ends of k_range (the same criterion kneed uses, on normalized axes). As
+    that distance is unimodal for a convex decreasing curve, it is bracketed
+    instead of sweeping every k: each round measures ELBOW_PROBES evenly spaced k
+    inside the bracket and keeps the neighbours of the best one, until the
+    bracket is at most 2 wide. This takes roughly a quarter of the fits of a full sweep.
+    
+    Inertias are measured on a sample of at most ELBOW_SAMPLE_SIZE rows; the location
+    of the elbow does not depend on the absolute inertia scale.
+    
+    Returns:
+        (optimal_k, k_values, inertias) for the k values that were measured
+    """
+    cache_file = elbow_cache_file(content_hash(embeddings), inertia_backend())
+    k_min, k_max = int(k_range[0]), int(k_range[1])
+    print(f"Finding optimal k using elbow method (range {k_range})...")
     
+    # Inertias are cached per k for these embeddings, so later searches only fit
+    # the k values that have not been measured yet
+    known = {}
     if use_cache and os.path.exists(cache_file):
-        print(f"🔎 Found cached elbow search '{cache_file}' – loading...")
-        results = np.load(cache_file)
-        k_values, inertias = results[0], results[1]
-        print(f"✅ Loaded cached elbow search results")
-    else:
-        print(f"Finding optimal k using elbow method (range {k_range})...")
-        k_values = list(range(k_range[0], k_range[1] + 1, 1))  # Step by 1 for precision
-        inertias = []
-        
-        for k in k_values:
-            print(f"   Testing k={k}...", flush=True)
-            # Use consistent method for elbow search with multiple runs for stability
-            if TORCH_AVAILABLE and torch.cuda.is_available():
-                # Multiple runs with different seeds for stability
-                best_inertia = float('inf')
-                for seed in [42, 123, 456]:  # Multiple random seeds
-                    labels = kmeans_pytorch(embeddings, k, random_state=seed)
-                    # Calculate inertia manually
-                    centroids = np.array([embeddings[labels == i].mean(axis=0) for i in range(k)])
-                    inertia = sum(np.sum((embeddings[labels == i] - centroids[i])**2) for i in range(k))
-                    best_inertia = min(best_inertia, inertia)
-                inertias.append(best_inertia)
-            else:
-                # Use scikit-learn with multiple initializations for stability
-                kmeans = KMeans(n_clusters=k, random_state=42, n_init=10, init='k-means++')
-                kmeans.fit(embeddings)
-                inertias.append(kmeans.inertia_)
-        
-        # Save to cache
-        if use_cache:
-            np.save(cache_file, [k_values, inertias])
-            print(f"💾 Elbow search results cached to '{cache_file}'")
+        with np.load(cache_file) as results:
+            known = dict(zip(results['k_values'].tolist(), results['inertias'].tolist()))
+        print(f"🔎 Found cached elbow inertias '{cache_file}' ({len(known)} k values)")
     
-    # Find elbow
-    kneedle = KneeLocator(k_values, inertias, curve="convex", direction="decreasing")
-    optimal_k = kneedle.elbow
+    sample = None
+    n_fitted = 0
     
-    if optimal_k is None:
-        optimal_k = k_values[len(k_values) // 2]  # Fallback to middle value
+    def measure(ks):
+        nonlocal sample, n_fitted
+        missing = sorted(set(int(k) for k in ks) - set(known))
+        if not missing:
+            return
+        if sample is None:
+            sample = elbow_sample(embeddings)
+            if len(sample) < len(embeddings):
+                print(f"   Sampling {len(sample):,} of {len(embeddings):,} embeddings for the elbow search")
+        known.update(zip(missing, _measure_inertias(sample, missing)))
+        n_fitted += len(missing)
+    
+    measure([k_min, k_max])
+    inertia_min, inertia_max = known[k_max], known[k_min]
+    
+    def below_chord(k):
+        x = (k - k_min) / max(k_max - k_min, 1)
+        y = (known[k] - inertia_min) / (inertia_max - inertia_min) if inertia_max > inertia_min else 1.0
+        return (1.0 - x) - y
+    
+    lo, hi = k_min, k_max
+    while hi - lo > 2:
+        measure(np.linspace(lo, hi, ELBOW_PROBES + 2).round()[1:-1])
+        candidates = sorted(k for k in known if lo <= k <= hi)
+        best = max(candidates[1:-1], key=below_chord)
+        i = candidates.index(best)
+        lo, hi = candidates[i - 1], candidates[i + 1]
+    measure(range(lo, hi + 1))
+    
+    k_values = sorted(k for k in known if k_min <= k <= k_max)
+    inertias = [known[k] for k in k_values]
+    best = max(k_values, key=below_chord)
+    
+    if n_fitted:
+        print(f"   Fitted {n_fitted} k values ({len(k_values)} measured in range)")
+        # Save to cache (every k measured so far)
+        if use_cache:
+            cached_k = sorted(known)
+            np.savez(cache_file, k_values=np.asarray(cached_k),
+                     inertias=np.asarray([known[k] for k in cached_k]))
+            print(f"💾 Elbow inertias cached to '{cache_file}'")
+    
+    if below_chord(best) <= 0:
+        optimal_k = (k_min + k_max) // 2  # Fallback to middle value
         print(f"⚠️  No clear elbow found, using k={optimal_k}")
     else:
+        optimal_k = best
         print(f"📈 Optimal k found: {optimal_k}")
     
     return optimal_k, k_values, inertias
 
-def perform_clustering_cpu(embeddings, optimal_k, cache_file=None):
-    """Perform K-means clustering on CPU with proper initialization."""
+def warm_start_centers(embeddings, optimal_k, embeddings_hash, cache_dir):
+    """
+    Initial centroids from the cached labels of the nearest other k on the same embeddings.
+    
+    Cached labels are looked up in cache_dir, the directory of perform_clustering's
+    label cache. The centroids of the largest optimal_k cached clusters are kept;
+    if there are fewer, the rest are seeded with random rows. Returns
+    (centers, source_k), or (None, None) when no usable cache exists.
+    """
+    nearby = []
+    for path in glob.glob(os.path.join(glob.escape(cache_dir), f"cluster_labels_k=*_{embeddings_hash}.npy")):
+        match = re.match(r"cluster_labels_k=(\d+)_", os.path.basename(path))
+        if match and int(match.group(1)) != optimal_k:
+            nearby.append((abs(int(match.group(1)) - optimal_k), int(match.group(1)), path))
+    if not nearby:
+        return None, None
+    _, source_k, path = min(nearby)
+    labels = np.load(path, allow_pickle=False).astype(np.int64)
+    if len(labels) != len(embeddings):
+        return None, None
+    
+    # Per-cluster sums as one sparse one-hot product, largest clusters first
+    X = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n_labels = int(labels.max()) + 1
+    one_hot = sp.csr_matrix((np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+                            shape=(n_labels, len(labels)))
+    counts = np.bincount(labels, minlength=n_labels)
+    keep = np.argsort(-counts, kind='stable')[:optimal_k]
+    keep = keep[counts[keep] > 0]
+    centers = np.asarray(one_hot[keep] @ X) / counts[keep, None]
+    if len(centers) < optimal_k:
+        rng = np.random.default_rng(42)
+        extra = X[rng.choice(len(X), optimal_k - len(centers), replace=False)]
+        centers = np.vstack([centers, extra])
+    return np.ascontiguousarray(centers, dtype=np.float32), source_k
+
+def perform_clustering_cpu(embeddings, optimal_k, cache_file=None, init=None):
+    """
+    Perform K-means clustering on CPU with proper initialization.
+    
+    Uses FAISS's SIMD/OpenMP K-means when installed (centroids are trained on FAISS's
+    default subsample of up to 256 points per cluster, then every row is assigned),
+    otherwise scikit-learn's Elkan K-means. A single k-means++ initialization is run,
+    or init (optimal_k x D centroids, see warm_start_centers) when given.
+    """
     print(f"🚀 Performing K-means (k={optimal_k}) on CPU...", flush=True)
+    X = np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    if FAISS_AVAILABLE:
+        print("   Running FAISS K-means...", flush=True)
+        kmeans = faiss.Kmeans(X.shape[1], optimal_k, niter=300, nredo=1, seed=42, gpu=False)
+        kmeans.train(X, init_centroids=init)
+        sq_distances, labels = kmeans.index.search(X, 1)
+        labels = labels.ravel()
+        print(f"   FAISS K-means completed! Final inertia: {sq_distances.sum():.0f}", flush=True)
+        return labels
     
-    # Use K-means++ initialization with multiple runs for stability
-    kmeans = KMeans(n_clusters=optimal_k, random_state=42, n_init=10, init='k-means++')
+    # One k-means++ (or warm) start converges about as well as many restarts on these
+    # embeddings; Elkan's triangle-inequality bounds skip most distance evaluations
+    kmeans = KMeans(n_clusters=optimal_k, random_state=42, n_init=1,
+                    init='k-means++' if init is None else init, algorithm='elkan')
     print("   Running CPU K-means...", flush=True)
-    labels = kmeans.fit_predict(embeddings)
+    labels = kmeans.fit_predict(X)
     print(f"   CPU K-means completed! Final inertia: {kmeans.inertia_:.0f}", flush=True)
     
     return labels
 
+def to_device_tensor(embeddings):
+    """Push embeddings to the PyTorch device once so k-sweeps can reuse the tensor."""
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return torch.from_numpy(np.ascontiguousarray(embeddings, dtype=np.float32)).to(device)
+
+def perform_clustering_on_device(X, optimal_k, seeds=(42, 123, 456)):
+    """
+    Best-of-seeds K-means on a device-resident tensor.
+    
+    Returns:
+        (labels, inertia) for the seed with the lowest inertia
+    """
+    best_labels = None
+    best_inertia = float('inf')
+    
+    for seed in seeds:  # Multiple seeds for stability
+        labels, _, inertia = kmeans_pytorch_on_device(X, optimal_k, random_state=seed)
+        
+        if inertia < best_inertia:
+            best_inertia = inertia
+            best_labels = labels
+    
+    return best_labels, best_inertia
+
+def silhouette_on_device(X, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=42, chunk_size=4096):
+    """
+    Euclidean silhouette score on the PyTorch device over a subsample of rows.
+    
+    Draws the same sample as silhouette_score(sample_size=..., random_state=...), so the
+    score matches the scikit-learn path. X may be a device tensor or a host array; only the
+    sampled rows are moved, and distances are taken one block of chunk_size rows at a time.
+    """
+    labels = np.asarray(labels)
+    n = len(labels)
+    if n > sample_size:
+        idx = np.random.RandomState(random_state).permutation(n)[:sample_size]
+        X = X[torch.as_tensor(idx, device=X.device)] if torch.is_tensor(X) else X[idx]
+        labels = labels[idx]
+    if not torch.is_tensor(X):
+        X = to_device_tensor(X)
+    
+    _, labels_t = torch.unique(torch.as_tensor(labels, device=X.device), return_inverse=True)
+    n_clusters = int(labels_t.max()) + 1
+    counts = torch.bincount(labels_t, minlength=n_clusters).to(X.dtype)
+    
+    # Summed distance from every sampled point to the members of every cluster: (n, K)
+    cluster_sums = torch.empty(len(X), n_clusters, device=X.device, dtype=X.dtype)
+    for start in range(0, len(X), chunk_size):
+        distances = torch.cdist(X[start:start + chunk_size], X, compute_mode="donot_use_mm_for_euclid_dist")
+        cluster_sums[start:start + chunk_size] = torch.zeros(
+            len(distances), n_clusters, device=X.device, dtype=X.dtype
+        ).index_add_(1, labels_t, distances)
+    
+    # a: mean over the other members of the own cluster; b: nearest other cluster
+    own_counts = counts[labels_t]
+    a = cluster_sums.gather(1, labels_t.unsqueeze(1)).squeeze(1) / (own_counts - 1).clamp(min=1)
+    mean_distances = cluster_sums / counts
+    mean_distances.scatter_(1, labels_t.unsqueeze(1), float('inf'))
+    b = mean_distances.min(dim=1).values
+    
+    s = torch.nan_to_num((b - a) / torch.maximum(a, b))
+    s[own_counts <= 1] = 0.0  # Singleton clusters score 0, as in scikit-learn
+    return s.mean().item()
+
 def perform_clustering_pytorch(embeddings, optimal_k, cache_file=None):
     """Perform K-means clustering using PyTorch (GPU if available)."""
     device_name = "GPU" if torch.cuda.is_available() else "CPU"
     print(f"🚀 Performing K-means (k={optimal_k}) on PyTorch ({device_name})...", flush=True)
     
     try:
-        # Use multiple runs for better stability
-        best_labels = None
-        best_inertia = float('inf')
-        
-        for seed in [42, 123, 456]:  # Multiple seeds for stability
-            labels = kmeans_pytorch(embeddings, optimal_k, random_state=seed)
-            # Calculate inertia
-            centroids = np.array([embeddings[labels == i].mean(axis=0) for i in range(optimal_k)])
-            inertia = sum(np.sum((embeddings[labels == i] - centroids[i])**2) for i in range(optimal_k))
-            
-            if inertia < best_inertia:
-                best_inertia = inertia
-                best_labels = labels
+        X = to_device_tensor(embeddings)
+        best_labels, best_inertia = perform_clustering_on_device(X, optimal_k)
         
         print(f"   PyTorch K-means completed on {device_name}! Best inertia: {best_inertia:.0f}", flush=True)
         return best_labels
@@ -196,17 +426,38 @@ def perform_clustering_pytorch(embeddings, optimal_k, cache_file=None):
         print("   🔄 Falling back to CPU K-means...", flush=True)
         return perform_clustering_cpu(embeddings, optimal_k, cache_file)
 
-def perform_clustering_cuml(embeddings, optimal_k, cache_file=None):
-    """Perform K-means clustering on GPU with cuML."""
+def to_cupy(embeddings):
+    """Upload embeddings to the GPU once so K-means, silhouette and UMAP can share the array."""
+    return cp.asarray(embeddings, dtype=cp.float32)
+
+def silhouette_cuml(cu_embeddings, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=42):
+    """Euclidean silhouette score on GPU over a uniform subsample of rows."""
+    cu_labels = cp.asarray(labels)
+    n = cu_embeddings.shape[0]
+    if n > sample_size:
+        idx = cp.asarray(np.random.default_rng(random_state).choice(n, sample_size, replace=False))
+        cu_embeddings, cu_labels = cu_embeddings[idx], cu_labels[idx]
+    # Chunked so the pairwise-distance block stays at 10k x sample_size
+    return float(cu_silhouette_score(cu_embeddings, cu_labels, chunksize=10_000))
+
+def perform_clustering_cuml(embeddings, optimal_k, cache_file=None, cu_embeddings=None, init=None):
+    """
+    Perform K-means clustering on GPU with cuML (one initialization).
+    
+    cu_embeddings: optional CuPy copy of embeddings already on the device; only
+    the labels are copied back to the host.
+    init: optional optimal_k x D starting centroids (see warm_start_centers).
+    """
     print(f"🚀 Attempting K-means (k={optimal_k}) on cuML GPU...", flush=True)
     
     try:
-        # cuML expects CuPy array; convert then get() back to NumPy
-        print("   Converting to CuPy array...", flush=True)
-        cu_embeddings = cp.asarray(embeddings, dtype=cp.float32)
-        kmeans = cuKMeans(n_clusters=optimal_k, random_state=42, max_iter=300, n_init=5)
+        if cu_embeddings is None:
+            print("   Converting to CuPy array...", flush=True)
+            cu_embeddings = to_cupy(embeddings)
+        kmeans = cuKMeans(n_clusters=optimal_k, random_state=42, max_iter=300, tol=1e-4, n_init=1,
+                          init='scalable-k-means++' if init is None else cp.asarray(init))
         print("   Running cuML K-means...", flush=True)
-        labels = kmeans.fit_predict(cu_embeddings).get()
+        labels = cp.asnumpy(kmeans.fit_predict(cu_embeddings))
         print("   cuML K-means completed!", flush=True)
         return labels
     except Exception as e:
@@ -214,7 +465,43 @@ def perform_clustering_cuml(embeddings, optimal_k, cache_file=None):
         print("   🔄 Falling back to PyTorch K-means...", flush=True)
         return perform_clustering_pytorch(embeddings, optimal_k, cache_file)
 
-def perform_clustering(embeddings, optimal_k=None, k_range=(5, 50), backend="auto", use_cache=True):
+def perform_clustering_cuvs(embeddings, optimal_k, cache_file=None, cu_embeddings=None, init=None):
+    """
+    Perform K-means clustering on GPU with cuVS (fused distance + argmin kernels).
+    
+    cu_embeddings: optional CuPy copy of embeddings already on the device; only
+    the labels are copied back to the host. Falls back to cuML on failure.
+    init: optional optimal_k x D starting centroids (see warm_start_centers).
+    """
+    print(f"🚀 Attempting K-means (k={optimal_k}) on cuVS GPU...", flush=True)
+    
+    try:
+        if cu_embeddings is None:
+            print("   Converting to CuPy array...", flush=True)
+            cu_embeddings = to_cupy(embeddings)
+        if init is None:
+            params = cuvs_kmeans.KMeansParams(n_clusters=optimal_k, max_iter=300, tol=1e-4)
+            centroids = None
+        else:
+            params = cuvs_kmeans.KMeansParams(n_clusters=optimal_k, max_iter=300, tol=1e-4,
+                                              init_method="Array")
+            centroids = cp.array(init, dtype=cp.float32)
+        print("   Running cuVS K-means...", flush=True)
+        centroids, inertia, n_iter = cuvs_kmeans.fit(params, cu_embeddings, centroids)
+        labels, _ = cuvs_kmeans.predict(params, cu_embeddings, centroids)
+        labels = cp.asnumpy(cp.asarray(labels))
+        print(f"   cuVS K-means completed in {n_iter} iterations! Inertia: {float(inertia):.0f}", flush=True)
+        return labels
+    except Exception as e:
+        print(f"   ❌ cuVS K-means failed: {e}")
+        if CUML_AVAILABLE:
+            print("   🔄 Falling back to cuML K-means...", flush=True)
+            return perform_clustering_cuml(embeddings, optimal_k, cache_file, cu_embeddings, init)
+        print("   🔄 Falling back to PyTorch K-means...", flush=True)
+        return perform_clustering_pytorch(embeddings, optimal_k, cache_file)
+
+def perform_clustering(embeddings, optimal_k=None, k_range=(5, 50), backend="auto", use_cache=True,
+                       cu_embeddings=None):
     """
     Perform clustering with caching support.
     
@@ -222,8 +509,10 @@ def perform_clustering(embeddings, optimal_k=None, k_range=(5, 50), backend="aut
         embeddings: Input embeddings
         optimal_k: Number of clusters (if None, will find optimal k)
         k_range: Range for elbow method (min_k, max_k), only used if optimal_k is None
-        backend: "cpu", "pytorch", "cuml", or "auto"
+        backend: "cpu", "pytorch", "cuml", "cuvs", or "auto"
         use_cache: Whether to use caching
+        cu_embeddings: Optional CuPy copy of embeddings (see to_cupy), reused by
+            cuML K-means and the silhouette score instead of uploading again
     """
     # Find optimal k if not provided
     if optimal_k is None:
@@ -233,53 +522,76 @@ def perform_clustering(embeddings, optimal_k=None, k_range=(5, 50), backend="aut
     print(f"\n🔍 Starting clustering with k={optimal_k}...", flush=True)
     
     # Check cache
-    cache_file = f"cluster_labels_k={optimal_k}_papers={len(embeddings)}.npy"
+    embeddings_hash = content_hash(embeddings)
+    cache_file = f"cluster_labels_k={optimal_k}_{embeddings_hash}.npy"
     if use_cache and os.path.exists(cache_file):
         print(f"🔎 Found cached clustering '{cache_file}' – loading…", flush=True)
-        labels = np.load(cache_file)
+        labels = np.load(cache_file, allow_pickle=False)
         if len(labels) == len(embeddings):
             print("✅ Cache size OK – skipping K-means", flush=True)
             return labels
         else:
             print("⚠️  Cache size mismatch – recomputing", flush=True)
     
+    # Warm-start from the cached clustering of the nearest k, if any
+    init, source_k = warm_start_centers(
+        embeddings, optimal_k, embeddings_hash, os.path.dirname(os.path.abspath(cache_file))
+    ) if use_cache else (None, None)
+    if init is not None:
+        print(f"♻️  Warm-starting K-means from cached k={source_k} clustering", flush=True)
+    
     # Choose backend
     if backend == "cpu":
-        labels = perform_clustering_cpu(embeddings, optimal_k, cache_file)
+        labels = perform_clustering_cpu(embeddings, optimal_k, cache_file, init)
     elif backend == "pytorch":
         if TORCH_AVAILABLE:
             labels = perform_clustering_pytorch(embeddings, optimal_k, cache_file)
         else:
             print("⚠️  PyTorch not available, falling back to CPU")
-            labels = perform_clustering_cpu(embeddings, optimal_k, cache_file)
+            labels = perform_clustering_cpu(embeddings, optimal_k, cache_file, init)
     elif backend == "cuml":
         if CUML_AVAILABLE:
-            labels = perform_clustering_cuml(embeddings, optimal_k, cache_file)
+            labels = perform_clustering_cuml(embeddings, optimal_k, cache_file, cu_embeddings, init)
         else:
             print("⚠️  cuML not available, falling back to PyTorch")
             labels = perform_clustering_pytorch(embeddings, optimal_k, cache_file)
+    elif backend == "cuvs":
+        if CUVS_AVAILABLE:
+            labels = perform_clustering_cuvs(embeddings, optimal_k, cache_file, cu_embeddings, init)
+        else:
+            print("⚠️  cuVS not available, falling back to PyTorch")
+            labels = perform_clustering_pytorch(embeddings, optimal_k, cache_file)
     elif backend == "auto":
         # Smart backend selection based on data size and available libraries
         data_size = embeddings.shape[0] * embeddings.shape[1]
         
-        if data_size > 100000 and CUML_AVAILABLE:  # Large data + cuML available
-            labels = perform_clustering_cuml(embeddings, optimal_k, cache_file)
+        if data_size > 100000 and CUVS_AVAILABLE:  # Large data + cuVS available
+            labels = perform_clustering_cuvs(embeddings, optimal_k, cache_file, cu_embeddings, init)
+        elif data_size > 100000 and CUML_AVAILABLE:  # Large data + cuML available
+            labels = perform_clustering_cuml(embeddings, optimal_k, cache_file, cu_embeddings, init)
         elif TORCH_AVAILABLE and torch.cuda.is_available():  # PyTorch GPU available
             labels = perform_clustering_pytorch(embeddings, optimal_k, cache_file)
         else:  # Fallback to CPU
-            labels = perform_clustering_cpu(embeddings, optimal_k, cache_file)
+            labels = perform_clustering_cpu(embeddings, optimal_k, cache_file, init)
     else:
-        raise ValueError(f"Unknown backend: {backend}. Use 'cpu', 'pytorch', 'cuml', or 'auto'.")
+        raise ValueError(f"Unknown backend: {backend}. Use 'cpu', 'pytorch', 'cuml', 'cuvs', or 'auto'.")
     
     # Quality metric
     if optimal_k > 1:
-        sil = silhouette_score(embeddings, labels)
-        print(f"   Silhouette score: {sil:.4f}", flush=True)
+        if cu_embeddings is not None and CUML_AVAILABLE:
+            sil = silhouette_cuml(cu_embeddings, labels)
+            print(f"   Silhouette score (GPU, {min(len(labels), SILHOUETTE_SAMPLE_SIZE):,} samples): {sil:.4f}", flush=True)
+        elif TORCH_AVAILABLE and torch.cuda.is_available():
+            sil = silhouette_on_device(embeddings, labels)
+            print(f"   Silhouette score (PyTorch GPU, {min(len(labels), SILHOUETTE_SAMPLE_SIZE):,} samples): {sil:.4f}", flush=True)
+        else:
+            sil = silhouette_score(embeddings, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=42)
+            print(f"   Silhouette score ({min(len(labels), SILHOUETTE_SAMPLE_SIZE):,} samples): {sil:.4f}", flush=True)
     
     # Save cache
     if use_cache:
         print(f"💾 Saving cluster labels to '{cache_file}'...", flush=True)
-        np.save(cache_file, labels)
+        np.save(cache_file, labels, allow_pickle=False)
         print(f"✅ Cluster labels cached to '{cache_file}'", flush=True)
     
     return labels
@@ -288,13 +600,22 @@ def debug_clustering_small(embeddings, max_k=20):
     """Debug clustering on a small subset with detailed output."""
     print(f"🔧 Debug clustering on {len(embeddings)} samples (max k={max_k})")
     
+    # Keep embeddings on the GPU across the whole k-sweep when possible
+    X_gpu = None
+    if TORCH_AVAILABLE and torch.cuda.is_available():
+        X_gpu = to_device_tensor(embeddings)
+    
     # Test different k values
     for k in range(2, min(max_k + 1, len(embeddings))):
         print(f"   Testing k={k}...")
-        labels = perform_clustering(embeddings, optimal_k=k, use_cache=False)
+        if X_gpu is not None:
+            labels, _ = perform_clustering_on_device(X_gpu, k)
+            sil = silhouette_on_device(X_gpu, labels)
+        else:
+            labels = perform_clustering(embeddings, optimal_k=k, use_cache=False)
+            sil = silhouette_score(embeddings, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=42)
         
         if k > 1:
-            sil = silhouette_score(embeddings, labels)
             unique_labels = len(np.unique(labels))
             print(f"     k={k}: {unique_labels} clusters, silhouette={sil:.4f}")
         
@@ -6,109 +6,454 @@ Supports UMAP and t-SNE for projecting high-dimensional embeddings to 2D.
 
 import numpy as np
 import os
+import joblib
+import logging
+import multiprocessing
 import umap
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
 from sklearn.manifold import TSNE
+from data_loader import content_hash
+
+logger = logging.getLogger(__name__)
 
 # Try to import GPU libraries
 try:
     from cuml.manifold import UMAP as cuUMAP
     import cupy as cp
     CUML_UMAP_AVAILABLE = True
-    print("✅ cuML UMAP found – GPU UMAP acceleration available")
+    logger.info("✅ cuML UMAP found – GPU UMAP acceleration available")
 except ImportError:
     CUML_UMAP_AVAILABLE = False
-    print("⚠️  cuML UMAP not available – using CPU UMAP only")
+    logger.warning("⚠️  cuML UMAP not available – using CPU UMAP only")
+
+try:
+    from cuml.manifold import TSNE as cuTSNE
+    CUML_TSNE_AVAILABLE = True
+except ImportError:
+    CUML_TSNE_AVAILABLE = False
+
+try:
+    from openTSNE import TSNE as OpenTSNE
+    OPENTSNE_AVAILABLE = True
+except ImportError:
+    OPENTSNE_AVAILABLE = False
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+try:
+    import rmm
+    RMM_AVAILABLE = True
+except ImportError:
+    RMM_AVAILABLE = False
+
+# Initial size of the RMM pool shared by CuPy, cuML (UMAP, FAISS scratch) and cuGraph
+RMM_POOL_SIZE = "8GB"
+_rmm_pool_enabled = False
+
+def enable_rmm_pool(initial_pool_size=RMM_POOL_SIZE):
+    """
+    Route CuPy/cuML/cuGraph device allocations through one RMM memory pool.
+    
+    Call once from the entry point (run_full_pipeline), before the first GPU
+    allocation; later calls are no-ops. Returns True if the pool is active.
+    """
+    global _rmm_pool_enabled
+    if _rmm_pool_enabled or not (RMM_AVAILABLE and CUML_UMAP_AVAILABLE):
+        return _rmm_pool_enabled
+    try:
+        try:
+            from rmm.allocators.cupy import rmm_cupy_allocator
+        except ImportError:
+            rmm_cupy_allocator = rmm.rmm_cupy_allocator
+        rmm.reinitialize(pool_allocator=True, initial_pool_size=initial_pool_size)
+        cp.cuda.set_allocator(rmm_cupy_allocator)
+        _rmm_pool_enabled = True
+        logger.info(f"✅ RMM memory pool enabled ({initial_pool_size} initial)")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not enable RMM memory pool: {e}")
+    return _rmm_pool_enabled
+
+# Above this many points CPU-only runs build the k-NN graph with an HNSW index
+# (below it, UMAP's own NN-descent is fast enough and is not cached)
+HNSW_MIN_POINTS = 200_000
+
+def as_float32(embeddings):
+    """
+    Return embeddings as C-contiguous float32 (no copy if already so).
+    
+    k-NN search and the UMAP/t-SNE optimizers are memory-bound, so float64 input
+    doubles the traffic for no visible gain in a 2D layout.
+    """
+    if embeddings.dtype != np.float32 or not embeddings.flags['C_CONTIGUOUS']:
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    return embeddings
+
+def compute_knn_hnsw(X, n_neighbors):
+    """Approximate k-NN graph on CPU with an hnswlib HNSW index."""
+    index = hnswlib.Index(space='l2', dim=X.shape[1])
+    index.init_index(max_elements=len(X), ef_construction=200, M=16)
+    index.add_items(X, num_threads=-1)
+    index.set_ef(max(n_neighbors * 2, 50))
+    knn_indices, sq_dists = index.knn_query(X, k=n_neighbors, num_threads=-1)
+    return knn_indices, np.sqrt(sq_dists)  # hnswlib 'l2' returns squared distances
+
+def compute_knn(embeddings, n_neighbors=15, use_cache=True):
+    """
+    Compute the k-NN graph used by UMAP, cached by embeddings content.
+    
+    The k-NN graph only depends on the embeddings and n_neighbors, so repeated
+    UMAP runs (e.g. min_dist sweeps) can skip UMAP's own neighbor search.
+    
+    Exact search runs on the GPU (FAISS GPU, else cuML); CPU-only runs with more
+    than HNSW_MIN_POINTS points use an approximate hnswlib index when available.
+    Otherwise there is no search faster than UMAP's own NN-descent, and None is
+    returned so umap-learn does its own.
+    
+    Returns:
+        (knn_indices, knn_dists) of shape (N, n_neighbors), each point being its own
+        first neighbor, or None
+    """
+    faiss_gpu = FAISS_AVAILABLE and hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+    use_hnsw = (HNSWLIB_AVAILABLE and not faiss_gpu and not CUML_UMAP_AVAILABLE
+                and len(embeddings) > HNSW_MIN_POINTS)
+    if not (faiss_gpu or CUML_UMAP_AVAILABLE or use_hnsw):
+        return None
+    
+    cache_file = f"knn_{content_hash(embeddings)}_k{n_neighbors}{'_hnsw' if use_hnsw else ''}.npz"
+    if use_cache and os.path.exists(cache_file):
+        logger.info(f"🔎 Found cached k-NN graph '{cache_file}' – loading...")
+        with np.load(cache_file) as knn:
+            return knn['indices'], knn['dists']
+    
+    X = as_float32(embeddings)
+    
+    if use_hnsw:
+        logger.info(f"   🔍 Computing approximate {n_neighbors}-NN graph with hnswlib (N={len(X):,})...")
+        knn_indices, knn_dists = compute_knn_hnsw(X, n_neighbors)
+    elif faiss_gpu:
+        logger.info(f"   🔍 Computing exact {n_neighbors}-NN graph with FAISS GPU...")
+        gpu_resources = faiss.StandardGpuResources()
+        index = faiss.index_cpu_to_gpu(gpu_resources, 0, faiss.IndexFlatL2(X.shape[1]))
+        index.add(X)
+        sq_dists, knn_indices = index.search(X, n_neighbors)
+        knn_dists = np.sqrt(np.maximum(sq_dists, 0))  # FAISS L2 returns squared distances
+    else:
+        logger.info(f"   🔍 Computing exact {n_neighbors}-NN graph with cuML...")
+        from cuml.neighbors import NearestNeighbors as cuNearestNeighbors
+        nn = cuNearestNeighbors(n_neighbors=n_neighbors).fit(X)
+        knn_dists, knn_indices = nn.kneighbors(X)
+    
+    knn_indices = np.asarray(knn_indices, dtype=np.int64)
+    knn_dists = np.asarray(knn_dists, dtype=np.float32)
+    
+    if use_cache:
+        np.savez(cache_file, indices=knn_indices, dists=knn_dists)
+        logger.info(f"💾 k-NN graph cached to '{cache_file}'")
+    
+    return knn_indices, knn_dists
+
+def save_projection(cache_file, embeddings_2d):
+    """
+    Save a 2D projection as per-axis uint16 quantized coordinates.
+    
+    65535 levels per axis is far below plotting resolution and quarters the
+    size of a float64 cache; the high-dimensional embeddings are never quantized.
+    """
+    lo = embeddings_2d.min(axis=0).astype(np.float64)
+    hi = embeddings_2d.max(axis=0).astype(np.float64)
+    scale = np.where(hi > lo, hi - lo, 1.0)
+    q = np.rint((embeddings_2d - lo) / scale * 65535).astype(np.uint16)
+    np.savez(cache_file, lo=lo, hi=hi, q=q)
+
+def load_projection(cache_file):
+    """Load a projection written by save_projection as float32 coordinates."""
+    with np.load(cache_file, allow_pickle=False) as cached:
+        lo, hi, q = cached["lo"], cached["hi"], cached["q"]
+    scale = np.where(hi > lo, hi - lo, 1.0)
+    return (q.astype(np.float64) / 65535 * scale + lo).astype(np.float32)
+
+# In-process LRU of fitted UMAP reducers, so sweeps and repeated transform() calls
+# reuse the fit
+_FITTED_REDUCERS = OrderedDict()
+MAX_FITTED_REDUCERS = 4
+# Also dump fitted reducers with joblib next to the projection caches (opt-in: a
+# reducer holds its kNN graph and can take several GB on disk)
+PERSIST_REDUCERS = False
+
+def _reducer_key(backend, embeddings, n_neighbors, min_dist, random_state, fit_sample_size=None):
+    return (backend, content_hash(embeddings), n_neighbors, min_dist, random_state, fit_sample_size)
+
+def _reducer_cache_file(key):
+    backend, h, n_neighbors, min_dist, random_state, fit_sample_size = key
+    sample_tag = f"_s{fit_sample_size}" if fit_sample_size else ""
+    return f"umap_reducer_{backend}_{h}_n{n_neighbors}_d{min_dist}_r{random_state}{sample_tag}.joblib"
+
+def _remember_reducer(key, reducer, use_cache):
+    _FITTED_REDUCERS[key] = reducer
+    _FITTED_REDUCERS.move_to_end(key)
+    while len(_FITTED_REDUCERS) > MAX_FITTED_REDUCERS:
+        _FITTED_REDUCERS.popitem(last=False)
+    if use_cache and PERSIST_REDUCERS:
+        joblib.dump(reducer, _reducer_cache_file(key), compress=3)
+
+def _lookup_reducer(key, use_cache):
+    if key in _FITTED_REDUCERS:
+        _FITTED_REDUCERS.move_to_end(key)
+        return _FITTED_REDUCERS[key]
+    cache_file = _reducer_cache_file(key)
+    if use_cache and os.path.exists(cache_file):
+        logger.info(f"🔎 Found cached UMAP reducer '{cache_file}' – loading...")
+        reducer = joblib.load(cache_file)
+        _remember_reducer(key, reducer, use_cache=False)
+        return reducer
+    return None
+
+def get_fitted_umap(embeddings, n_neighbors=15, min_dist=0.1, random_state=42, backend="cpu",
+                    use_cache=True, fit_sample_size=None):
+    """
+    Return the UMAP reducer fitted by an earlier project_to_2d_umap_* call, or None.
+    
+    backend: "cpu" or "gpu", matching the projection that produced the fit.
+    """
+    embeddings = as_float32(embeddings)
+    fit_sample_size = _effective_sample_size(embeddings, fit_sample_size)
+    key = _reducer_key(backend, embeddings, n_neighbors, min_dist, random_state, fit_sample_size)
+    return _lookup_reducer(key, use_cache)
+
+def _to_numpy(array):
+    return array.get() if hasattr(array, "get") else np.asarray(array)
+
+# Rows per transform() call when projecting onto a reducer fitted on a sample
+UMAP_TRANSFORM_CHUNK = 1_000_000
+
+def _effective_sample_size(embeddings, fit_sample_size):
+    """fit_sample_size if it actually subsamples embeddings, else None."""
+    if fit_sample_size is not None and len(embeddings) > fit_sample_size:
+        return fit_sample_size
+    return None
+
+def _fit_on_sample(reducer, embeddings, fit_sample_size, random_state, to_input=np.asarray):
+    """Fit reducer on a uniform random sample of fit_sample_size rows."""
+    idx = np.random.default_rng(random_state).choice(len(embeddings), fit_sample_size, replace=False)
+    logger.info(f"   🎯 Fitting UMAP on {fit_sample_size:,} of {len(embeddings):,} rows...")
+    reducer.fit(to_input(embeddings[np.sort(idx)]))
+
+def _transform_in_chunks(reducer, embeddings, to_input=np.asarray):
+    """Project all rows through a fitted reducer, UMAP_TRANSFORM_CHUNK rows at a time."""
+    logger.info(f"   🔁 Transforming {len(embeddings):,} rows onto the fitted UMAP...")
+    return np.concatenate([
+        _to_numpy(reducer.transform(to_input(embeddings[i:i + UMAP_TRANSFORM_CHUNK])))
+        for i in range(0, len(embeddings), UMAP_TRANSFORM_CHUNK)
+    ])
+
+def to_device_async(embeddings):
+    """
+    Start an asynchronous host-to-device copy of float32 embeddings via pinned memory.
+    
+    Returns (device_array, stream, pinned_host_array). Keep the pinned array alive
+    and call stream.synchronize() before the device array is used.
+    """
+    pinned_mem = cp.cuda.alloc_pinned_memory(embeddings.nbytes)
+    pinned = np.frombuffer(pinned_mem, dtype=np.float32, count=embeddings.size).reshape(embeddings.shape)
+    pinned[...] = embeddings
+    
+    stream = cp.cuda.Stream(non_blocking=True)
+    cu_embeddings = cp.empty(embeddings.shape, dtype=cp.float32)
+    cu_embeddings.data.copy_from_host_async(pinned.ctypes.data, embeddings.nbytes, stream)
+    return cu_embeddings, stream, pinned
 
 def project_to_2d_umap_gpu(embeddings, 
                            n_neighbors=15, 
                            min_dist=0.1, 
                            random_state=42,
-                           use_cache=True):
-    """Project embeddings to 2D using GPU-accelerated cuML UMAP."""
-    print("🚀 Projecting embeddings to 2D using GPU UMAP (cuML)...")
+                           use_cache=True,
+                           precomputed_knn=None,
+                           fit_sample_size=None,
+                           verbose=False,
+                           cu_embeddings=None):
+    """
+    Project embeddings to 2D using GPU-accelerated cuML UMAP.
     
-    # Create cache filename based on embeddings shape and parameters
-    cache_file = f"cuml_umap_2d_embeddings_{embeddings.shape[0]}x{embeddings.shape[1]}_n{n_neighbors}_d{min_dist}.npy"
+    fit_sample_size: if set and smaller than len(embeddings), fit on a uniform
+    sample of that many rows and transform the rest (precomputed_knn is ignored).
+    verbose: print UMAP's per-epoch progress and GPU memory usage.
+    cu_embeddings: optional float32 CuPy copy of embeddings already on the device,
+    used for the full fit instead of uploading again.
+    """
+    logger.info("🚀 Projecting embeddings to 2D using GPU UMAP (cuML)...")
+    embeddings = as_float32(embeddings)
+    fit_sample_size = _effective_sample_size(embeddings, fit_sample_size)
+    sample_tag = f"_s{fit_sample_size}" if fit_sample_size else ""
+    
+    # Create cache filename based on embeddings content and parameters
+    cache_file = f"cuml_umap_2d_embeddings_{content_hash(embeddings)}_n{n_neighbors}_d{min_dist}{sample_tag}.npz"
     
     # Check if cached UMAP projection exists
     if use_cache and os.path.exists(cache_file):
-        print(f"🔎 Found cached GPU UMAP projection '{cache_file}' – loading...")
-        embeddings_2d = np.load(cache_file)
-        print(f"✅ Loaded cached GPU UMAP projection with shape: {embeddings_2d.shape}")
+        logger.info(f"🔎 Found cached GPU UMAP projection '{cache_file}' – loading...")
+        embeddings_2d = load_projection(cache_file)
+        logger.info(f"✅ Loaded cached GPU UMAP projection with shape: {embeddings_2d.shape}")
         return embeddings_2d
     
-    print("   No cache found – computing new GPU UMAP projection...")
+    logger.info("   No cache found – computing new GPU UMAP projection...")
     
     try:
-        # Convert to CuPy array for GPU processing
-        print(f"   📊 Converting {embeddings.shape} embeddings to GPU...")
-        cu_embeddings = cp.asarray(embeddings, dtype=cp.float32)
-        
-        # Show GPU memory usage
-        gpu_mem_used = cp.cuda.MemoryPool().used_bytes() / 1e6
-        print(f"   📊 GPU memory used: {gpu_mem_used:.1f} MB")
-        
-        reducer = cuUMAP(
-            n_components=2, 
-            random_state=random_state, 
-            n_neighbors=n_neighbors, 
-            min_dist=min_dist,
-            verbose=True
-        )
-        
-        print("   🚀 Running GPU UMAP...")
-        embeddings_2d_gpu = reducer.fit_transform(cu_embeddings)
-        
-        # Convert back to NumPy
-        embeddings_2d = embeddings_2d_gpu.get()
-        print(f"   ✅ GPU UMAP completed! Shape: {embeddings_2d.shape}")
+        key = _reducer_key("gpu", embeddings, n_neighbors, min_dist, random_state, fit_sample_size)
+        reducer = _lookup_reducer(key, use_cache)
+        if reducer is not None:
+            logger.info("   ♻️  Reusing fitted GPU UMAP reducer")
+            if fit_sample_size:
+                embeddings_2d = _transform_in_chunks(reducer, embeddings, cp.asarray)
+            else:
+                embeddings_2d = _to_numpy(reducer.embedding_)
+        elif fit_sample_size:
+            reducer = cuUMAP(
+                n_components=2, 
+                random_state=random_state, 
+                n_neighbors=n_neighbors, 
+                min_dist=min_dist,
+                verbose=verbose
+            )
+            _fit_on_sample(reducer, embeddings, fit_sample_size, random_state, cp.asarray)
+            _remember_reducer(key, reducer, use_cache)
+            embeddings_2d = _transform_in_chunks(reducer, embeddings, cp.asarray)
+        else:
+            if cu_embeddings is None:
+                # Start the host-to-device copy, then build the k-NN graph while it runs
+                logger.info(f"   📊 Copying {embeddings.shape} embeddings to GPU (async)...")
+                cu_embeddings, copy_stream, pinned = to_device_async(embeddings)
+            else:
+                logger.info("   ♻️  Reusing embeddings already on the GPU")
+                copy_stream = pinned = None
+            
+            if precomputed_knn is None:
+                precomputed_knn = compute_knn(embeddings, n_neighbors, use_cache)
+            
+            if copy_stream is not None:
+                copy_stream.synchronize()
+            del pinned
+            
+            # Show device memory in use (allocator-independent, so it covers the RMM pool)
+            if verbose:
+                free_bytes, total_bytes = cp.cuda.runtime.memGetInfo()
+                logger.info(f"   📊 GPU memory used: {(total_bytes - free_bytes) / 1e6:.1f} MB")
+            
+            reducer = cuUMAP(
+                n_components=2, 
+                random_state=random_state, 
+                n_neighbors=n_neighbors, 
+                min_dist=min_dist,
+                precomputed_knn=precomputed_knn,
+                verbose=verbose
+            )
+            
+            logger.info("   🚀 Running GPU UMAP...")
+            embeddings_2d_gpu = reducer.fit_transform(cu_embeddings)
+            _remember_reducer(key, reducer, use_cache)
+            
+            # Convert back to NumPy
+            embeddings_2d = _to_numpy(embeddings_2d_gpu)
+        logger.info(f"   ✅ GPU UMAP completed! Shape: {embeddings_2d.shape}")
         
         # Save UMAP projection to cache
         if use_cache:
-            print(f"💾 Saving GPU UMAP projection to cache '{cache_file}'...")
-            np.save(cache_file, embeddings_2d)
-            print(f"✅ GPU UMAP projection cached for future runs!")
+            logger.info(f"💾 Saving GPU UMAP projection to cache '{cache_file}'...")
+            save_projection(cache_file, embeddings_2d)
+            logger.info(f"✅ GPU UMAP projection cached for future runs!")
         
         return embeddings_2d
         
     except Exception as e:
-        print(f"   ❌ GPU UMAP failed: {e}")
-        print("   🔄 Falling back to CPU UMAP...")
-        return project_to_2d_umap_cpu(embeddings, n_neighbors, min_dist, random_state, use_cache)
+        logger.error(f"   ❌ GPU UMAP failed: {e}")
+        logger.info("   🔄 Falling back to CPU UMAP...")
+        return project_to_2d_umap_cpu(embeddings, n_neighbors, min_dist, random_state, use_cache, precomputed_knn,
+                                      fit_sample_size, verbose)
 
 def project_to_2d_umap_cpu(embeddings, 
                            n_neighbors=15, 
                            min_dist=0.1, 
                            random_state=42,
-                           use_cache=True):
-    """Project embeddings to 2D using CPU UMAP."""
-    print("💻 Projecting embeddings to 2D using CPU UMAP...")
+                           use_cache=True,
+                           precomputed_knn=None,
+                           fit_sample_size=None,
+                           verbose=False):
+    """
+    Project embeddings to 2D using CPU UMAP.
+    
+    fit_sample_size: if set and smaller than len(embeddings), fit on a uniform
+    sample of that many rows and transform the rest (precomputed_knn is ignored,
+    since transform() needs UMAP's own nearest-neighbor index).
+    verbose: print UMAP's per-epoch progress.
+    """
+    logger.info("💻 Projecting embeddings to 2D using CPU UMAP...")
+    embeddings = as_float32(embeddings)
+    fit_sample_size = _effective_sample_size(embeddings, fit_sample_size)
+    sample_tag = f"_s{fit_sample_size}" if fit_sample_size else ""
     
-    # Create cache filename based on embeddings shape and parameters
-    cache_file = f"cpu_umap_2d_embeddings_{embeddings.shape[0]}x{embeddings.shape[1]}_n{n_neighbors}_d{min_dist}.npy"
+    # Create cache filename based on embeddings content and parameters
+    cache_file = f"cpu_umap_2d_embeddings_{content_hash(embeddings)}_n{n_neighbors}_d{min_dist}{sample_tag}.npz"
     
     # Check if cached UMAP projection exists
     if use_cache and os.path.exists(cache_file):
-        print(f"🔎 Found cached CPU UMAP projection '{cache_file}' – loading...")
-        embeddings_2d = np.load(cache_file)
-        print(f"✅ Loaded cached CPU UMAP projection with shape: {embeddings_2d.shape}")
+        logger.info(f"🔎 Found cached CPU UMAP projection '{cache_file}' – loading...")
+        embeddings_2d = load_projection(cache_file)
+        logger.info(f"✅ Loaded cached CPU UMAP projection with shape: {embeddings_2d.shape}")
         return embeddings_2d
     
-    print("   No cache found – computing new CPU UMAP projection...")
-    reducer = umap.UMAP(
-        n_components=2, 
-        random_state=random_state, 
-        n_neighbors=n_neighbors, 
-        min_dist=min_dist,
-        verbose=True
-    )
-    embeddings_2d = reducer.fit_transform(embeddings)
+    logger.info("   No cache found – computing new CPU UMAP projection...")
+    key = _reducer_key("cpu", embeddings, n_neighbors, min_dist, random_state, fit_sample_size)
+    reducer = _lookup_reducer(key, use_cache)
+    if reducer is not None:
+        logger.info("   ♻️  Reusing fitted CPU UMAP reducer")
+        if fit_sample_size:
+            embeddings_2d = _transform_in_chunks(reducer, embeddings)
+        else:
+            embeddings_2d = np.asarray(reducer.embedding_)
+    elif fit_sample_size:
+        reducer = umap.UMAP(
+            n_components=2, 
+            random_state=random_state, 
+            n_neighbors=n_neighbors, 
+            min_dist=min_dist,
+            verbose=verbose
+        )
+        _fit_on_sample(reducer, embeddings, fit_sample_size, random_state)
+        _remember_reducer(key, reducer, use_cache)
+        embeddings_2d = _transform_in_chunks(reducer, embeddings)
+    else:
+        if precomputed_knn is None:
+            precomputed_knn = compute_knn(embeddings, n_neighbors, use_cache)
+        # (None, None, None) is umap-learn's default: run its own NN-descent
+        knn = (None, None, None) if precomputed_knn is None else (*precomputed_knn[:2], None)
+        
+        reducer = umap.UMAP(
+            n_components=2, 
+            random_state=random_state, 
+            n_neighbors=n_neighbors, 
+            min_dist=min_dist,
+            precomputed_knn=knn,
+            verbose=verbose
+        )
+        embeddings_2d = reducer.fit_transform(embeddings)
+        _remember_reducer(key, reducer, use_cache)
     
     # Save UMAP projection to cache
     if use_cache:
-        print(f"💾 Saving CPU UMAP projection to cache '{cache_file}'...")
-        np.save(cache_file, embeddings_2d)
-        print(f"✅ CPU UMAP projection cached for future runs!")
+        logger.info(f"💾 Saving CPU UMAP projection to cache '{cache_file}'...")
+        save_projection(cache_file, embeddings_2d)
+        logger.info(f"✅ CPU UMAP projection cached for future runs!")
     
     return embeddings_2d
 
@@ -117,60 +462,161 @@ def project_to_2d_umap(embeddings,
                        min_dist=0.1, 
                        random_state=42,
                        use_cache=True,
-                       backend="auto"):
-    """Project embeddings to 2D using UMAP with backend selection."""
+                       backend="auto",
+                       precomputed_knn=None,
+                       fit_sample_size=None,
+                       verbose=False,
+                       cu_embeddings=None):
+    """
+    Project embeddings to 2D using UMAP with backend selection.
+    
+    precomputed_knn: optional (knn_indices, knn_dists); computed and cached via compute_knn if None
+        (UMAP's own neighbor search is used when compute_knn has no fast backend).
+    fit_sample_size: fit on this many sampled rows and transform the rest (for very large N).
+    cu_embeddings: optional CuPy copy of embeddings, used by the GPU backend only.
+    """
     
     # Backend selection
     if backend == "gpu" or (backend == "auto" and CUML_UMAP_AVAILABLE):
         if CUML_UMAP_AVAILABLE:
-            return project_to_2d_umap_gpu(embeddings, n_neighbors, min_dist, random_state, use_cache)
+            return project_to_2d_umap_gpu(embeddings, n_neighbors, min_dist, random_state, use_cache, precomputed_knn,
+                                          fit_sample_size, verbose, cu_embeddings)
         else:
-            print("⚠️  GPU UMAP not available, falling back to CPU")
-            return project_to_2d_umap_cpu(embeddings, n_neighbors, min_dist, random_state, use_cache)
+            logger.warning("⚠️  GPU UMAP not available, falling back to CPU")
+            return project_to_2d_umap_cpu(embeddings, n_neighbors, min_dist, random_state, use_cache, precomputed_knn,
+                                          fit_sample_size, verbose)
     else:
-        return project_to_2d_umap_cpu(embeddings, n_neighbors, min_dist, random_state, use_cache)
+        return project_to_2d_umap_cpu(embeddings, n_neighbors, min_dist, random_state, use_cache, precomputed_knn,
+                                      fit_sample_size, verbose)
 
 def project_to_2d_tsne(embeddings, 
                        perplexity=30, 
                        random_state=42,
-                       use_cache=True):
-    """Project embeddings to 2D using t-SNE."""
-    print("Projecting embeddings to 2D using t-SNE...")
+                       use_cache=True,
+                       backend="auto",
+                       verbose=False):
+    """
+    Project embeddings to 2D using t-SNE.
     
-    # Create cache filename based on embeddings shape and parameters
-    cache_file = f"tsne_2d_embeddings_{embeddings.shape[0]}x{embeddings.shape[1]}_p{perplexity}.npy"
+    Backends: "gpu" uses cuML's FFT t-SNE, "cpu" uses openTSNE's multithreaded
+    FFT t-SNE (FIt-SNE) when installed and scikit-learn's Barnes-Hut otherwise;
+    "auto" prefers the GPU. verbose prints the optimizer's progress.
+    """
+    logger.info("Projecting embeddings to 2D using t-SNE...")
+    embeddings = as_float32(embeddings)
+    
+    # Resolve implementation
+    if backend == "gpu" or (backend == "auto" and CUML_TSNE_AVAILABLE):
+        if CUML_TSNE_AVAILABLE:
+            implementation = "cuml"
+        else:
+            logger.warning("⚠️  GPU t-SNE not available, falling back to CPU")
+            implementation = "opentsne" if OPENTSNE_AVAILABLE else "sklearn"
+    else:
+        implementation = "opentsne" if OPENTSNE_AVAILABLE else "sklearn"
+    
+    # Create cache filename based on embeddings content and parameters
+    cache_file = f"tsne_2d_embeddings_{implementation}_{content_hash(embeddings)}_p{perplexity}.npz"
     
     # Check if cached t-SNE projection exists
     if use_cache and os.path.exists(cache_file):
-        print(f"🔎 Found cached t-SNE projection '{cache_file}' – loading...")
-        embeddings_2d = np.load(cache_file)
-        print(f"✅ Loaded cached t-SNE projection with shape: {embeddings_2d.shape}")
+        logger.info(f"🔎 Found cached t-SNE projection '{cache_file}' – loading...")
+        embeddings_2d = load_projection(cache_file)
+        logger.info(f"✅ Loaded cached t-SNE projection with shape: {embeddings_2d.shape}")
         return embeddings_2d
     
-    print("   No cache found – computing new t-SNE projection...")
+    logger.info(f"   No cache found – computing new t-SNE projection ({implementation})...")
     # Limit perplexity for small datasets
     actual_perplexity = min(perplexity, (len(embeddings) - 1) // 3)
     
-    reducer = TSNE(
-        n_components=2,
-        random_state=random_state,
-        perplexity=actual_perplexity,
-        verbose=1
-    )
-    embeddings_2d = reducer.fit_transform(embeddings)
+    if implementation == "cuml":
+        reducer = cuTSNE(
+            n_components=2,
+            perplexity=actual_perplexity,
+            method='fft',
+            random_state=random_state,
+            verbose=verbose
+        )
+        embeddings_2d = np.asarray(reducer.fit_transform(embeddings))
+    elif implementation == "opentsne":
+        reducer = OpenTSNE(
+            n_components=2,
+            perplexity=actual_perplexity,
+            negative_gradient_method='fft',
+            n_jobs=-1,
+            random_state=random_state,
+            verbose=verbose
+        )
+        embeddings_2d = np.asarray(reducer.fit(embeddings))
+    else:
+        reducer = TSNE(
+            n_components=2,
+            random_state=random_state,
+            perplexity=actual_perplexity,
+            verbose=1 if verbose else 0
+        )
+        embeddings_2d = reducer.fit_transform(embeddings)
     
     # Save t-SNE projection to cache
     if use_cache:
-        print(f"💾 Saving t-SNE projection to cache '{cache_file}'...")
-        np.save(cache_file, embeddings_2d)
-        print(f"✅ t-SNE projection cached for future runs!")
+        logger.info(f"💾 Saving t-SNE projection to cache '{cache_file}'...")
+        save_projection(cache_file, embeddings_2d)
+        logger.info(f"✅ t-SNE projection cached for future runs!")
     
     return embeddings_2d
 
+# Sign bits of a random projection used to find near-duplicate candidates
+DEDUPE_N_BITS = 64
+# A candidate joins its group only within this relative distance of the group's representative
+DEDUPE_RTOL = 1e-3
+# Only project unique rows when at least this fraction of rows are duplicates
+DEDUPE_MIN_RATE = 0.05
+
+def find_near_duplicates(embeddings, n_bits=DEDUPE_N_BITS, rtol=DEDUPE_RTOL,
+                         min_rate=DEDUPE_MIN_RATE, random_state=42, chunk_size=1_000_000):
+    """
+    Group near-duplicate rows: random-hyperplane LSH signatures propose groups, and
+    a row is only merged if ||row - representative|| <= rtol * ||representative||
+    (rows failing the check are projected on their own).
+    
+    Returns (unique_idx, inverse) such that embeddings[unique_idx][inverse]
+    matches embeddings to within rtol, or None if fewer than min_rate of rows are duplicates.
+    """
+    rng = np.random.default_rng(random_state)
+    hyperplanes = rng.standard_normal((embeddings.shape[1], n_bits)).astype(np.float32)
+    bits = np.packbits(embeddings @ hyperplanes > 0, axis=1)
+    signatures = bits.view(np.dtype((np.void, bits.shape[1]))).ravel()
+    
+    _, unique_idx, inverse = np.unique(signatures, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    if 1.0 - len(unique_idx) / len(embeddings) < min_rate:
+        return None
+    
+    # Signatures only compare angles: confirm every candidate against its representative
+    confirmed = np.empty(len(embeddings), dtype=bool)
+    for start in range(0, len(embeddings), chunk_size):
+        rows = embeddings[start:start + chunk_size]
+        reps = embeddings[unique_idx[inverse[start:start + chunk_size]]]
+        confirmed[start:start + chunk_size] = (
+            np.linalg.norm(rows - reps, axis=1) <= rtol * np.linalg.norm(reps, axis=1)
+        )
+    singles = np.flatnonzero(~confirmed)
+    unique_idx = np.concatenate([unique_idx, singles])
+    inverse[singles] = len(unique_idx) - len(singles) + np.arange(len(singles))
+    
+    duplicate_rate = 1.0 - len(unique_idx) / len(embeddings)
+    if duplicate_rate < min_rate:
+        return None
+    
+    logger.info(f"   🔁 {duplicate_rate:.1%} near-duplicate rows – projecting {len(unique_idx)} unique rows")
+    return unique_idx, inverse
+
 def project_to_2d(embeddings, 
                   method="umap", 
                   use_cache=True,
                   backend="auto",
+                  dedupe=False,
+                  cu_embeddings=None,
                   **kwargs):
     """
     Project embeddings to 2D using the specified method.
@@ -179,45 +625,90 @@ def project_to_2d(embeddings,
         embeddings: High-dimensional embeddings
         method: "umap" or "tsne"
         use_cache: Whether to use caching
-        backend: "cpu", "gpu", or "auto" (for UMAP only)
+        backend: "cpu", "gpu", or "auto"
+        dedupe: Project only one row per group of near-duplicates (see
+            find_near_duplicates) and scatter the result back; ignored when
+            precomputed_knn is given
+        cu_embeddings: Optional CuPy copy of embeddings for GPU UMAP to reuse
         **kwargs: Method-specific parameters
     """
+    if method not in ("umap", "tsne"):
+        raise ValueError(f"Unknown method: {method}. Use 'umap' or 'tsne'.")
+    
+    embeddings = as_float32(embeddings)
+    duplicates = None
+    if dedupe and kwargs.get("precomputed_knn") is None:
+        duplicates = find_near_duplicates(embeddings)
+    if duplicates is not None:
+        unique_idx, inverse = duplicates
+        embeddings = embeddings[unique_idx]
+        if cu_embeddings is not None:
+            cu_embeddings = cu_embeddings[cp.asarray(unique_idx)]
+    
     if method == "umap":
-        return project_to_2d_umap(embeddings, use_cache=use_cache, backend=backend, **kwargs)
-    elif method == "tsne":
-        return project_to_2d_tsne(embeddings, use_cache=use_cache, **kwargs)
+        embeddings_2d = project_to_2d_umap(embeddings, use_cache=use_cache, backend=backend,
+                                           cu_embeddings=cu_embeddings, **kwargs)
     else:
-        raise ValueError(f"Unknown method: {method}. Use 'umap' or 'tsne'.")
+        embeddings_2d = project_to_2d_tsne(embeddings, use_cache=use_cache, backend=backend, **kwargs)
+    
+    if duplicates is not None:
+        embeddings_2d = embeddings_2d[inverse]
+    return embeddings_2d
+
+def _debug_project_shared(shm_name, shape, method):
+    """Worker for debug_projection_small: project a float32 array held in shared memory."""
+    shm = SharedMemory(name=shm_name)
+    try:
+        embeddings = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        if method == "umap":
+            return project_to_2d_umap_cpu(embeddings, use_cache=False)
+        return project_to_2d_tsne(embeddings, use_cache=False, backend="cpu")
+    finally:
+        shm.close()
 
 def debug_projection_small(embeddings, max_samples=500):
-    """Debug projection on a small subset with both methods."""
-    print(f"🔧 Debug projection on {len(embeddings)} samples")
+    """
+    Debug projection on a small subset with both methods.
+    
+    CPU UMAP and t-SNE run in worker processes (reading the subset from shared
+    memory) while GPU UMAP runs in this process.
+    """
+    logger.info(f"🔧 Debug projection on {len(embeddings)} samples")
     
     # Subsample if too large
     if len(embeddings) > max_samples:
-        indices = np.random.choice(len(embeddings), max_samples, replace=False)
-        embeddings_subset = embeddings[indices]
-        print(f"   Subsampled to {len(embeddings_subset)} samples")
+        indices = np.random.default_rng().choice(len(embeddings), max_samples, replace=False)
+        embeddings_subset = as_float32(embeddings[indices])
+        logger.info(f"   Subsampled to {len(embeddings_subset)} samples")
     else:
-        embeddings_subset = embeddings
+        embeddings_subset = as_float32(embeddings)
     
-    # Test GPU UMAP if available
-    if CUML_UMAP_AVAILABLE:
-        print("   Testing GPU UMAP...")
-        try:
-            umap_gpu_2d = project_to_2d_umap_gpu(embeddings_subset, use_cache=False)
-            print(f"   GPU UMAP result shape: {umap_gpu_2d.shape}")
-        except Exception as e:
-            print(f"   GPU UMAP failed: {e}")
-    
-    # Test CPU UMAP
-    print("   Testing CPU UMAP...")
-    umap_2d = project_to_2d_umap_cpu(embeddings_subset, use_cache=False)
-    print(f"   CPU UMAP result shape: {umap_2d.shape}")
-    
-    # Test t-SNE
-    print("   Testing t-SNE...")
-    tsne_2d = project_to_2d_tsne(embeddings_subset, use_cache=False)
-    print(f"   t-SNE result shape: {tsne_2d.shape}")
-    
-    print("🔧 Debug projection completed") 
\ No newline at end of file
+    shm = SharedMemory(create=True, size=embeddings_subset.nbytes)
+    try:
+        np.ndarray(embeddings_subset.shape, dtype=np.float32, buffer=shm.buf)[:] = embeddings_subset
+        
+        # Fork so workers do not re-import this module and its GPU libraries;
+        # they only run CPU code
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("fork")) as pool:
+            logger.info("   Testing CPU UMAP and t-SNE in worker processes...")
+            umap_future = pool.submit(_debug_project_shared, shm.name, embeddings_subset.shape, "umap")
+            tsne_future = pool.submit(_debug_project_shared, shm.name, embeddings_subset.shape, "tsne")
+            
+            # Test GPU UMAP if available
+            if CUML_UMAP_AVAILABLE:
+                logger.info("   Testing GPU UMAP...")
+                try:
+                    umap_gpu_2d = project_to_2d_umap_gpu(embeddings_subset, use_cache=False)
+                    logger.info(f"   GPU UMAP result shape: {umap_gpu_2d.shape}")
+                except Exception as e:
+                    logger.error(f"   GPU UMAP failed: {e}")
+            
+            umap_2d = umap_future.result()
+            logger.info(f"   CPU UMAP result shape: {umap_2d.shape}")
+            tsne_2d = tsne_future.result()
+            logger.info(f"   t-SNE result shape: {tsne_2d.shape}")
+    finally:
+        shm.close()
+        shm.unlink()
+    
+    logger.info("🔧 Debug projection completed")
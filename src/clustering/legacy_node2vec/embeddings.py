@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 """
 Node2vec embedding generation with multiple backends and caching.
-Supports PecanPy (CPU), RAPIDS cuGraph (GPU), and other implementations.
+Supports PecanPy (CPU), RAPIDS cuGraph (GPU), PyTorch Geometric (GPU), and other implementations.
 """
 
 import numpy as np
 import os
+import tempfile
 import time
+from gensim.models import Word2Vec
 from pecanpy import pecanpy as p2v
+from data_loader import content_hash
 
 # Try to import GPU libraries
 try:
@@ -17,6 +20,25 @@ try:
 except ImportError:
     CUGRAPH_AVAILABLE = False
 
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import torch
+    import torch.nn.functional as F
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+try:
+    from torch_geometric.nn import Node2Vec
+    PYG_AVAILABLE = True
+except ImportError:
+    PYG_AVAILABLE = False
+
 # --- Configuration ---
 EMBEDDING_DIM = 128
 WINDOW_SIZE = 10
@@ -24,10 +46,277 @@ NUM_WALKS = 10
 WALK_LENGTH = 80
 P = 1.0  # Return parameter
 Q = 1.0  # In-out parameter
+SGNS_NEGATIVE = 5          # negative samples per (center, context) pair in train_sgns_torch
+SGNS_CHUNK_WALKS = 256     # walks expanded into skip-gram pairs at a time
+SGNS_BATCH_PAIRS = 65536   # (center, context) pairs per optimizer step
+PYG_BATCH_SIZE = 2048  # start nodes per PyG step; each yields NUM_WALKS walks split into context windows
+# PecanPy members pecanpy_walks uses instead of simulate_walks (PecanPy is pinned for them)
+PECANPY_WALK_INTERNALS = ("_preprocess_transition_probs", "_random_walks", "get_has_nbrs", "get_move_forward")
+
+def edge_list_hash(src_indices, dst_indices):
+    """Content hash of an edge list, used to key graph-derived caches."""
+    edges = np.stack([np.asarray(src_indices, dtype=np.int64), np.asarray(dst_indices, dtype=np.int64)])
+    return content_hash(edges)
+
+def generate_cache_filename(paper_ids, src_indices, dst_indices, embedding_dim, num_walks, walk_length, p, q, backend="pecanpy"):
+    """Generate a consistent cache filename based on the graph content and parameters."""
+    graph_key = edge_list_hash(src_indices, dst_indices)
+    return f"embeddings_{backend}_dim={embedding_dim}_walks={num_walks}_length={walk_length}_p={p}_q={q}_papers={len(paper_ids)}_{graph_key}.npy"
+
+def save_embeddings_cache(cache_file, embeddings):
+    """
+    Write an embedding cache: zstd-compressed (level 1, all cores) when zstandard
+    is installed, a plain .npy otherwise. Returns the path written.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if ZSTD_AVAILABLE:
+        cache_file += ".zst"
+        with open(cache_file, "wb") as f, zstd.ZstdCompressor(level=1, threads=-1).stream_writer(f) as writer:
+            np.save(writer, embeddings, allow_pickle=False)
+    else:
+        np.save(cache_file, embeddings, allow_pickle=False)
+    return cache_file
+
+def load_embeddings_cache(cache_file):
+    """
+    Load an embedding cache written by save_embeddings_cache, or None if there is none.
+    
+    A compressed cache is streamed through the decompressor; a plain .npy is
+    memory-mapped so pages are read on demand instead of loading the whole matrix.
+    """
+    if ZSTD_AVAILABLE and os.path.exists(cache_file + ".zst"):
+        print(f"🔎 Found cached embeddings '{cache_file}.zst' – loading...")
+        with open(cache_file + ".zst", "rb") as f, zstd.ZstdDecompressor().stream_reader(f) as reader:
+            embeddings = np.lib.format.read_array(reader, allow_pickle=False)
+    elif os.path.exists(cache_file):
+        print(f"🔎 Found cached embeddings '{cache_file}' – loading...")
+        embeddings = np.load(cache_file, mmap_mode='r', allow_pickle=False)
+    else:
+        return None
+    print(f"✅ Loaded cached embeddings with shape: {embeddings.shape}")
+    return embeddings
+
+def build_undirected_csr(src_indices, dst_indices, n_nodes):
+    """
+    Build a symmetric, deduplicated CSR adjacency (indptr, indices) in NumPy.
+    
+    Rows come out with sorted column indices, which PecanPy's SparseOTF relies on.
+    """
+    src = np.asarray(src_indices, dtype=np.int64)
+    dst = np.asarray(dst_indices, dtype=np.int64)
+    
+    # Encode each directed edge as a single int64 key; np.unique sorts by (row, col) and dedupes
+    keys = np.unique(np.concatenate([src * n_nodes + dst, dst * n_nodes + src]))
+    rows = keys // n_nodes
+    indices = (keys % n_nodes).astype(np.uint32)
+    
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_nodes), out=indptr[1:])
+    return indptr, indices
 
-def generate_cache_filename(paper_ids, embedding_dim, num_walks, walk_length, p, q, backend="pecanpy"):
-    """Generate a consistent cache filename based on parameters."""
-    return f"embeddings_{backend}_dim={embedding_dim}_walks={num_walks}_length={walk_length}_p={p}_q={q}_papers={len(paper_ids)}.npy"
+def save_csr_npz(path, indptr, indices):
+    """Write CSR arrays in PecanPy's .npz layout (IDs, data, indptr, indices)."""
+    n_nodes = len(indptr) - 1
+    np.savez(path,
+             IDs=np.arange(n_nodes).astype(str),
+             data=np.ones(len(indices), dtype=np.float32),
+             indptr=indptr,
+             indices=indices)
+
+class WalkCorpus:
+    """
+    Re-iterable Word2Vec corpus over flat random-walk output.
+    
+    Walks stay in the flat (vertex_paths, path_sizes) layout and are copied to the
+    host one chunk at a time, so only chunk_walks walks are ever materialized as
+    Python lists. Tokens come from a shared table of node-id strings, so walks are
+    built by fancy indexing instead of formatting a new str per visit. gensim
+    iterates it once per training epoch; the vocabulary comes from vertex_counts().
+    """
+    
+    def __init__(self, vertex_paths, path_sizes, n_nodes, chunk_walks=1_000_000):
+        self.vertex_paths = vertex_paths
+        self.offsets = np.concatenate([[0], np.cumsum(np.asarray(path_sizes, dtype=np.int64))])
+        self.n_nodes = n_nodes
+        self.tokens = np.array([str(i) for i in range(n_nodes)], dtype=object)
+        self.chunk_walks = chunk_walks
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def _chunks(self):
+        n_walks = len(self)
+        for start in range(0, n_walks, self.chunk_walks):
+            stop = min(start + self.chunk_walks, n_walks)
+            lo, hi = self.offsets[start], self.offsets[stop]
+            chunk = self.vertex_paths[lo:hi]
+            if hasattr(chunk, "to_numpy"):  # cuDF Series: one device-to-host copy per chunk
+                chunk = chunk.to_numpy()
+            yield np.asarray(chunk), self.offsets[start + 1:stop] - lo
+    
+    def vertex_counts(self):
+        """Return {token: visit count} for Word2Vec.build_vocab_from_freq."""
+        counts = np.zeros(self.n_nodes, dtype=np.int64)
+        for chunk, _ in self._chunks():
+            counts += np.bincount(chunk[chunk >= 0], minlength=self.n_nodes)
+        visited = np.flatnonzero(counts)
+        return dict(zip(self.tokens[visited].tolist(), counts[visited].tolist()))
+    
+    def __iter__(self):
+        for chunk, splits in self._chunks():
+            for walk in np.split(chunk, splits):
+                walk = walk[walk >= 0]  # Drop padding from fixed-length walk output
+                if len(walk) > 1:
+                    yield self.tokens[walk].tolist()
+
+def pecanpy_walks(model, num_walks, walk_length):
+    """
+    Run PecanPy's compiled walker and return the walks as a WalkCorpus layout.
+    
+    Same walks as model.simulate_walks, but the uint32 walk matrix is kept as is
+    instead of being mapped to one Python list of str per walk. Each row's last
+    entry holds its effective length; everything from there on is overwritten
+    with -1 in place, so the matrix reads as flat int32 walks of fixed width.
+    This relies on PecanPy internals (pinned in requirements_gpu.txt); if they
+    are missing, the walks come from the public simulate_walks instead.
+    """
+    if not all(hasattr(model, name) for name in PECANPY_WALK_INTERNALS):
+        print("⚠️  PecanPy walker internals not found, using simulate_walks")
+        walks = model.simulate_walks(num_walks, walk_length)
+        path_sizes = np.fromiter((len(walk) for walk in walks), dtype=np.int64, count=len(walks))
+        vertex_paths = np.fromiter((int(node) for walk in walks for node in walk),
+                                   dtype=np.int32, count=int(path_sizes.sum()))
+        return vertex_paths, path_sizes
+    
+    from numba_progress import ProgressBar
+    
+    model._preprocess_transition_probs()
+    start_node_idx_ary = np.tile(np.arange(model.num_nodes, dtype=np.uint32), num_walks)
+    np.random.seed(model.random_state)
+    np.random.shuffle(start_node_idx_ary)  # for balanced work load, as in PecanPy
+    
+    with ProgressBar(total=start_node_idx_ary.size, disable=not model.verbose) as progress:
+        walk_idx_mat = model._random_walks(start_node_idx_ary.size,
+                                           walk_length,
+                                           model.random_state,
+                                           start_node_idx_ary,
+                                           model.get_has_nbrs(),
+                                           model.get_move_forward(),
+                                           progress)
+    
+    n_walks, width = walk_idx_mat.shape
+    walk_idx_mat = walk_idx_mat.view(np.int32)
+    columns = np.arange(width)
+    for start in range(0, n_walks, 1_000_000):
+        rows = walk_idx_mat[start:start + 1_000_000]
+        rows[columns >= rows[:, -1:]] = -1
+    return walk_idx_mat.ravel(), np.full(n_walks, width, dtype=np.int64)
+
+def train_word2vec(walks, n_nodes, embedding_dim, workers=16, epochs=1, **w2v_kwargs):
+    """
+    Train Word2Vec on a WalkCorpus and return an (n_nodes, embedding_dim) float32 matrix.
+    
+    The vocabulary is counted from the integer walks rather than by a tokenizing
+    pass. Vocabulary keys are node indices, so the vector matrix is scattered into
+    place in one go (nodes never visited stay zero); the model, including its
+    output-layer weights, is dropped before returning.
+    """
+    print(f"   Training Word2Vec model on {len(walks):,} walks...")
+    model = Word2Vec(vector_size=embedding_dim,
+                     window=WINDOW_SIZE,
+                     min_count=1,
+                     workers=workers,
+                     epochs=epochs,
+                     **w2v_kwargs)
+    model.build_vocab_from_freq(walks.vertex_counts())
+    model.train(walks, total_examples=len(walks), epochs=model.epochs)
+    
+    embeddings = np.zeros((n_nodes, embedding_dim), dtype=np.float32)
+    node_ids = np.array(model.wv.index_to_key).astype(np.int64)
+    embeddings[node_ids] = model.wv.vectors
+    del model
+    return embeddings
+
+def train_sgns_torch(vertex_paths, path_sizes, n_nodes, embedding_dim, window=WINDOW_SIZE,
+                     negative=SGNS_NEGATIVE, epochs=1, lr=0.01, seed=42):
+    """
+    Skip-gram with negative sampling in PyTorch, on the device the walks live on.
+    
+    Takes the same flat (vertex_paths, path_sizes) layout as WalkCorpus, so cuGraph
+    walks never leave the GPU and no str tokens are built. SGNS_CHUNK_WALKS walks at
+    a time are scattered into a padded matrix, every (center, context) pair within
+    `window` is taken by shifting it, and negatives are drawn from the unigram^0.75
+    distribution as in word2vec. Returns an (n_nodes, embedding_dim) float32 NumPy
+    matrix; nodes never visited stay zero, as with train_word2vec.
+    """
+    values = getattr(vertex_paths, "values", vertex_paths)  # cuDF Series -> CuPy array
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    flat = torch.as_tensor(values, device=device)
+    sizes = torch.as_tensor(np.asarray(path_sizes, dtype=np.int64), device=device)
+    offsets = np.concatenate([[0], np.cumsum(np.asarray(path_sizes, dtype=np.int64))])
+    n_walks = len(offsets) - 1
+    width = int(sizes.max())
+    generator = torch.Generator(device=device).manual_seed(seed)
+    
+    # Unigram^0.75 negative-sampling table as a CDF for searchsorted
+    counts = torch.zeros(n_nodes, dtype=torch.float64, device=device)
+    for lo in range(0, len(flat), 100_000_000):
+        chunk = flat[lo:lo + 100_000_000].long()
+        counts += torch.bincount(chunk[chunk >= 0], minlength=n_nodes)
+    cdf = torch.cumsum(counts ** 0.75, 0)
+    cdf = (cdf / cdf[-1]).float()
+    
+    emb_in = torch.nn.Embedding(n_nodes, embedding_dim, sparse=True).to(device)
+    emb_out = torch.nn.Embedding(n_nodes, embedding_dim, sparse=True).to(device)
+    with torch.no_grad():
+        emb_in.weight.uniform_(-0.5 / embedding_dim, 0.5 / embedding_dim, generator=generator)
+        emb_out.weight.zero_()
+    optimizer = torch.optim.SparseAdam(list(emb_in.parameters()) + list(emb_out.parameters()), lr=lr)
+    
+    print(f"   Training skip-gram on {device.type} over {n_walks:,} walks...")
+    for epoch in range(epochs):
+        total_loss, n_steps = 0.0, 0
+        chunk_starts = torch.randperm((n_walks + SGNS_CHUNK_WALKS - 1) // SGNS_CHUNK_WALKS, generator=generator,
+                                      device=device).cpu().numpy() * SGNS_CHUNK_WALKS
+        for start in chunk_starts:
+            stop = min(start + SGNS_CHUNK_WALKS, n_walks)
+            lo, hi = offsets[start], offsets[stop]
+            
+            # Scatter this chunk's walks into a -1 padded (walks, width) matrix
+            chunk_sizes = sizes[start:stop]
+            walk_id = torch.repeat_interleave(torch.arange(stop - start, device=device), chunk_sizes)
+            position = torch.arange(hi - lo, device=device) - (torch.cumsum(chunk_sizes, 0) - chunk_sizes)[walk_id]
+            walks = torch.full((stop - start, width), -1, dtype=torch.long, device=device)
+            walks[walk_id, position] = flat[lo:hi].long()
+            
+            # Both directions of every pair within the window, padding dropped
+            centers, contexts = [], []
+            for shift in range(1, min(window, width - 1) + 1):
+                a, b = walks[:, :-shift].reshape(-1), walks[:, shift:].reshape(-1)
+                keep = (a >= 0) & (b >= 0)
+                centers += [a[keep], b[keep]]
+                contexts += [b[keep], a[keep]]
+            centers, contexts = torch.cat(centers), torch.cat(contexts)
+            order = torch.randperm(len(centers), generator=generator, device=device)
+            
+            for i in range(0, len(order), SGNS_BATCH_PAIRS):
+                batch = order[i:i + SGNS_BATCH_PAIRS]
+                noise = torch.searchsorted(cdf, torch.rand(len(batch), negative, generator=generator, device=device))
+                u = emb_in(centers[batch])
+                v = emb_out(contexts[batch])
+                v_neg = emb_out(noise.clamp_(max=n_nodes - 1))
+                loss = -(F.logsigmoid((u * v).sum(-1))
+                         + F.logsigmoid(-torch.bmm(v_neg, u.unsqueeze(2)).squeeze(2)).sum(-1)).mean()
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                total_loss += loss.item()
+                n_steps += 1
+        print(f"   Epoch {epoch + 1}/{epochs}: mean loss {total_loss / max(n_steps, 1):.4f}")
+    
+    embeddings = emb_in.weight.detach()
+    embeddings[counts == 0] = 0.0
+    return embeddings.cpu().numpy().astype(np.float32, copy=False)
 
 def generate_node2vec_pecanpy(paper_ids, src_indices, dst_indices, 
                              embedding_dim=EMBEDDING_DIM, 
@@ -35,55 +324,74 @@ def generate_node2vec_pecanpy(paper_ids, src_indices, dst_indices,
                              walk_length=WALK_LENGTH, 
                              p=P, q=Q,
                              use_cache=True):
-    """Generate node2vec embeddings using PecanPy SparseOTF (CPU)."""
-    print(f"Running PecanPy SparseOTF with {num_walks} walks of length {walk_length}...")
+    """
+    Generate node2vec embeddings using PecanPy (CPU).
+    
+    With p == q == 1 the second-order bias is uniform, so the cheaper first-order
+    FirstOrderUnweighted walker is used instead of SparseOTF.
+    """
+    first_order = (p == 1.0 and q == 1.0)
+    mode = "FirstOrderUnweighted" if first_order else "SparseOTF"
+    print(f"Running PecanPy {mode} with {num_walks} walks of length {walk_length}...")
     
     # Check cache
-    cache_file = generate_cache_filename(paper_ids, embedding_dim, num_walks, walk_length, p, q, "pecanpy")
-    if use_cache and os.path.exists(cache_file):
-        print(f"🔎 Found cached embeddings '{cache_file}' – loading...")
-        embeddings = np.load(cache_file)
-        print(f"✅ Loaded cached embeddings with shape: {embeddings.shape}")
+    cache_file = generate_cache_filename(paper_ids, src_indices, dst_indices, embedding_dim, num_walks, walk_length, p, q, "pecanpy")
+    embeddings = load_embeddings_cache(cache_file) if use_cache else None
+    if embeddings is not None:
         return embeddings
     
     print("   No cache found – training new embeddings...")
     start_time = time.time()
     
-    # Create temporary edge file
-    temp_edge_file = "temp_edges.edg"
-    with open(temp_edge_file, 'w') as f:
-        for src, dst in zip(src_indices, dst_indices):
-            f.write(f"{src}\t{dst}\n")
+    # Build the CSR graph in memory instead of formatting and re-parsing a text edge list.
+    # Node IDs are 0..N-1, so embedding rows line up with paper_ids (including isolated papers).
+    # With caching, the CSR file is kept, keyed by the edge list, so runs on the same graph
+    # with other walk parameters skip the build; otherwise it is a temp file removed after loading.
+    if use_cache:
+        csr_file = f"graph_csr_{edge_list_hash(src_indices, dst_indices)}_n{len(paper_ids)}.npz"
+    else:
+        fd, csr_file = tempfile.mkstemp(suffix=".npz")
+        os.close(fd)
+    if use_cache and os.path.exists(csr_file):
+        print(f"🔎 Found cached CSR graph '{csr_file}'")
+    else:
+        indptr, indices = build_undirected_csr(src_indices, dst_indices, len(paper_ids))
+        save_csr_npz(csr_file, indptr, indices)
+        del indptr, indices
     
-    # Create PecanPy model
-    model = p2v.SparseOTF(p=p, q=q, workers=16, verbose=True)
+    # Create PecanPy model (uniform first-order walks when p == q == 1)
+    if first_order:
+        model = p2v.FirstOrderUnweighted(p=p, q=q, workers=16, verbose=True)
+    else:
+        model = p2v.SparseOTF(p=p, q=q, workers=16, verbose=True)
     
-    # Load edge list
-    model.read_edg(temp_edge_file, weighted=False, directed=False)
+    # Load CSR graph (binary, no text parsing)
+    try:
+        model.read_npz(csr_file, weighted=False)
+    finally:
+        if not use_cache:
+            os.remove(csr_file)
     
-    # Generate embeddings
+    # Generate walks as one int32 matrix and stream them into skip-gram Word2Vec
+    # (PecanPy's embed() would first build a Python list of str per walk)
     print("Starting embedding training...")
     print("   This may take 2-3 minutes for Word2Vec training...")
-    embeddings = model.embed(
-        dim=embedding_dim,
-        num_walks=num_walks,
-        walk_length=walk_length,
-        window_size=WINDOW_SIZE,
-        epochs=1  # Reduced from 3 to 1 for faster processing
-    )
+    vertex_paths, path_sizes = pecanpy_walks(model, num_walks, walk_length)
+    walks = WalkCorpus(vertex_paths, path_sizes, len(paper_ids))
+    embeddings = train_word2vec(walks, len(paper_ids), embedding_dim,
+                                epochs=1,  # Reduced from 3 to 1 for faster processing
+                                sg=1)
+    del walks, vertex_paths
     print("Embedding training completed!")
     
-    # Clean up temporary file
-    os.remove(temp_edge_file)
-    
     # Save embeddings to cache
     if use_cache:
         print(f"💾 Saving embeddings to cache '{cache_file}'...")
-        np.save(cache_file, embeddings)
-        print(f"✅ Embeddings cached for future runs!")
+        cache_file = save_embeddings_cache(cache_file, embeddings)
+        print(f"✅ Embeddings cached to '{cache_file}' for future runs!")
     
     elapsed_time = time.time() - start_time
-    print(f"PecanPy SparseOTF completed in {elapsed_time:.2f} seconds")
+    print(f"PecanPy {mode} completed in {elapsed_time:.2f} seconds")
     print(f"Generated embeddings shape: {embeddings.shape}")
     
     return embeddings
@@ -94,18 +402,21 @@ def generate_node2vec_cugraph(paper_ids, src_indices, dst_indices,
                              walk_length=WALK_LENGTH,
                              p=P, q=Q,
                              use_cache=True):
-    """Generate node2vec embeddings using RAPIDS cuGraph (GPU)."""
+    """
+    Generate node2vec embeddings using RAPIDS cuGraph (GPU).
+    
+    With p == q == 1 node2vec reduces to uniform random walks, so
+    cugraph.uniform_random_walks is used instead of cugraph.node2vec.
+    """
     if not CUGRAPH_AVAILABLE:
         raise ImportError("RAPIDS cuGraph not available. Install with: pip install cugraph-cu12")
     
     print(f"Running RAPIDS cuGraph node2vec with {num_walks} walks of length {walk_length}...")
     
     # Check cache
-    cache_file = generate_cache_filename(paper_ids, embedding_dim, num_walks, walk_length, p, q, "cugraph")
-    if use_cache and os.path.exists(cache_file):
-        print(f"🔎 Found cached embeddings '{cache_file}' – loading...")
-        embeddings = np.load(cache_file)
-        print(f"✅ Loaded cached embeddings with shape: {embeddings.shape}")
+    cache_file = generate_cache_filename(paper_ids, src_indices, dst_indices, embedding_dim, num_walks, walk_length, p, q, "cugraph")
+    embeddings = load_embeddings_cache(cache_file) if use_cache else None
+    if embeddings is not None:
         return embeddings
     
     print("   No cache found – training new embeddings...")
@@ -113,50 +424,44 @@ def generate_node2vec_cugraph(paper_ids, src_indices, dst_indices,
     
     try:
         import cudf
+        import cupy as cp
         import cugraph
-        from gensim.models import Word2Vec
         
-        # Create cuDF DataFrame for edges
+        # Create cuDF DataFrame for edges: one contiguous int32 H2D copy per column
         edges_df = cudf.DataFrame({
-            'src': src_indices,
-            'dst': dst_indices
+            'src': cp.asarray(np.ascontiguousarray(src_indices, dtype=np.int32)),
+            'dst': cp.asarray(np.ascontiguousarray(dst_indices, dtype=np.int32))
         })
         
         # Create cuGraph
         G = cugraph.Graph()
         G.from_cudf_edgelist(edges_df, source='src', destination='dst')
         
-        # Generate random walks
+        # Generate random walks: num_walks walks from every vertex in the graph
         print("   Generating random walks on GPU...")
-        walks_df = cugraph.node2vec(G, 
-                                   start_vertices=None,  # All vertices
-                                   max_depth=walk_length,
-                                   num_walks=num_walks,
-                                   p=p,
-                                   q=q)
-        
-        # Convert walks to sequences for Word2Vec
-        print("   Converting walks for Word2Vec training...")
-        walks_list = []
-        for _, row in walks_df.iterrows():
-            walk = [str(int(node)) for node in row['vertex_path'] if node >= 0]
-            if len(walk) > 1:
-                walks_list.append(walk)
+        start_vertices = cudf.Series(cp.tile(G.nodes().values, num_walks))
+        if p == 1.0 and q == 1.0:
+            # Fixed-length output, padded with -1 where a walk stops early
+            vertex_paths, _, max_path_length = cugraph.uniform_random_walks(G,
+                                                                            start_vertices=start_vertices,
+                                                                            max_depth=walk_length)
+            path_sizes = np.full(len(start_vertices), max_path_length, dtype=np.int64)
+        else:
+            vertex_paths, _, path_sizes = cugraph.node2vec(G,
+                                                           start_vertices=start_vertices,
+                                                           max_depth=walk_length,
+                                                           compress_result=True,
+                                                           p=p,
+                                                           q=q)
+            path_sizes = path_sizes.to_numpy()
         
-        # Train Word2Vec model
-        print("   Training Word2Vec model...")
-        model = Word2Vec(walks_list, 
-                        vector_size=embedding_dim,
-                        window=WINDOW_SIZE,
-                        min_count=1,
-                        workers=16,
-                        epochs=1)
-        
-        # Extract embeddings
-        embeddings = np.zeros((len(paper_ids), embedding_dim))
-        for i, paper_id in enumerate(paper_ids):
-            if str(i) in model.wv:
-                embeddings[i] = model.wv[str(i)]
+        if TORCH_AVAILABLE and torch.cuda.is_available():
+            # Train skip-gram on the GPU straight from the device-resident walks
+            embeddings = train_sgns_torch(vertex_paths, path_sizes, len(paper_ids), embedding_dim)
+        else:
+            # Stream walks to Word2Vec chunk by chunk instead of materializing every walk
+            walks = WalkCorpus(vertex_paths, path_sizes, len(paper_ids))
+            embeddings = train_word2vec(walks, len(paper_ids), embedding_dim)
         
         print("Embedding training completed!")
         
@@ -169,8 +474,8 @@ def generate_node2vec_cugraph(paper_ids, src_indices, dst_indices,
     # Save embeddings to cache
     if use_cache:
         print(f"💾 Saving embeddings to cache '{cache_file}'...")
-        np.save(cache_file, embeddings)
-        print(f"✅ Embeddings cached for future runs!")
+        cache_file = save_embeddings_cache(cache_file, embeddings)
+        print(f"✅ Embeddings cached to '{cache_file}' for future runs!")
     
     elapsed_time = time.time() - start_time
     print(f"RAPIDS cuGraph completed in {elapsed_time:.2f} seconds")
@@ -178,8 +483,93 @@ def generate_node2vec_cugraph(paper_ids, src_indices, dst_indices,
     
     return embeddings
 
+def generate_node2vec_pyg(paper_ids, src_indices, dst_indices,
+                          embedding_dim=EMBEDDING_DIM,
+                          num_walks=NUM_WALKS,
+                          walk_length=WALK_LENGTH,
+                          p=P, q=Q,
+                          use_cache=True,
+                          epochs=1):
+    """
+    Generate node2vec embeddings with PyTorch Geometric (GPU when available).
+    
+    Both the biased random walks and skip-gram negative-sampling training run on
+    the device, so no walk corpus is built on the host and gensim is not used.
+    """
+    if not PYG_AVAILABLE:
+        raise ImportError("PyTorch Geometric not available. Install with: pip install torch-geometric torch-cluster")
+    
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Running PyTorch Geometric node2vec on {device.type} with {num_walks} walks of length {walk_length}...")
+    
+    # Check cache
+    cache_file = generate_cache_filename(paper_ids, src_indices, dst_indices, embedding_dim, num_walks, walk_length, p, q,
+                                         f"pyg_neg{SGNS_NEGATIVE}")
+    embeddings = load_embeddings_cache(cache_file) if use_cache else None
+    if embeddings is not None:
+        return embeddings
+    
+    print("   No cache found – training new embeddings...")
+    start_time = time.time()
+    
+    try:
+        # Undirected graph: every citation in both directions
+        src = torch.from_numpy(np.ascontiguousarray(src_indices, dtype=np.int64))
+        dst = torch.from_numpy(np.ascontiguousarray(dst_indices, dtype=np.int64))
+        edge_index = torch.stack([torch.cat([src, dst]), torch.cat([dst, src])]).to(device)
+        
+        model = Node2Vec(edge_index,
+                         embedding_dim=embedding_dim,
+                         walk_length=walk_length,
+                         context_size=WINDOW_SIZE + 1,
+                         walks_per_node=num_walks,
+                         p=p, q=q,
+                         num_negative_samples=SGNS_NEGATIVE,
+                         num_nodes=len(paper_ids),
+                         sparse=True).to(device)
+        loader = model.loader(batch_size=PYG_BATCH_SIZE, shuffle=True)
+        optimizer = torch.optim.SparseAdam(list(model.parameters()), lr=0.01)
+        
+        print("   Training skip-gram on device...")
+        model.train()
+        for epoch in range(epochs):
+            # Summed on the device and read once per epoch, so steps do not sync with the host
+            total_loss = torch.zeros((), device=device)
+            for pos_rw, neg_rw in loader:
+                optimizer.zero_grad()
+                loss = model.loss(pos_rw.to(device), neg_rw.to(device))
+                loss.backward()
+                optimizer.step()
+                total_loss += loss.detach()
+            print(f"   Epoch {epoch + 1}/{epochs}: mean loss {total_loss.item() / len(loader):.4f}")
+        
+        # Isolated papers are never in a real walk: zero them, as the other backends do
+        embeddings = model.embedding.weight.detach()
+        embeddings[torch.bincount(edge_index[0], minlength=len(paper_ids)) == 0] = 0.0
+        embeddings = embeddings.cpu().numpy().astype(np.float32, copy=False)
+        del model, optimizer, edge_index
+        print("Embedding training completed!")
+        
+    except Exception as e:
+        print(f"❌ PyTorch Geometric node2vec failed: {e}")
+        print("🔄 Falling back to PecanPy...")
+        return generate_node2vec_pecanpy(paper_ids, src_indices, dst_indices,
+                                       embedding_dim, num_walks, walk_length, p, q, use_cache)
+    
+    # Save embeddings to cache
+    if use_cache:
+        print(f"💾 Saving embeddings to cache '{cache_file}'...")
+        cache_file = save_embeddings_cache(cache_file, embeddings)
+        print(f"✅ Embeddings cached to '{cache_file}' for future runs!")
+    
+    elapsed_time = time.time() - start_time
+    print(f"PyTorch Geometric node2vec completed in {elapsed_time:.2f} seconds")
+    print(f"Generated embeddings shape: {embeddings.shape}")
+    
+    return embeddings
+
 def generate_node2vec_embeddings(paper_ids, src_indices, dst_indices,
-                               backend="pecanpy",
+                               backend="auto",
                                embedding_dim=EMBEDDING_DIM,
                                num_walks=NUM_WALKS,
                                walk_length=WALK_LENGTH,
@@ -189,13 +579,29 @@ def generate_node2vec_embeddings(paper_ids, src_indices, dst_indices,
     Generate node2vec embeddings using the specified backend.
     
     Args:
-        backend: "pecanpy" (CPU) or "cugraph" (GPU)
+        backend: "pecanpy" (CPU), "cugraph" (GPU walks), "pyg" (GPU walks and training),
+            or "auto" (cuGraph when available, then PyG on a CUDA device, then PecanPy)
     """
+    if backend == "auto":
+        if CUGRAPH_AVAILABLE:
+            backend = "cugraph"
+        elif PYG_AVAILABLE and torch.cuda.is_available():
+            backend = "pyg"
+        else:
+            backend = "pecanpy"
+    
     if backend == "pecanpy":
-        return generate_node2vec_pecanpy(paper_ids, src_indices, dst_indices,
-                                       embedding_dim, num_walks, walk_length, p, q, use_cache)
+        embeddings = generate_node2vec_pecanpy(paper_ids, src_indices, dst_indices,
+                                               embedding_dim, num_walks, walk_length, p, q, use_cache)
     elif backend == "cugraph":
-        return generate_node2vec_cugraph(paper_ids, src_indices, dst_indices,
-                                       embedding_dim, num_walks, walk_length, p, q, use_cache)
+        embeddings = generate_node2vec_cugraph(paper_ids, src_indices, dst_indices,
+                                               embedding_dim, num_walks, walk_length, p, q, use_cache)
+    elif backend == "pyg":
+        embeddings = generate_node2vec_pyg(paper_ids, src_indices, dst_indices,
+                                           embedding_dim, num_walks, walk_length, p, q, use_cache)
     else:
-        raise ValueError(f"Unknown backend: {backend}. Use 'pecanpy' or 'cugraph'.") 
\ No newline at end of file
+        raise ValueError(f"Unknown backend: {backend}. Use 'pecanpy', 'cugraph', 'pyg', or 'auto'.")
+    
+    # C-contiguous float32 for K-means/UMAP (a no-op view for fresh or memory-mapped float32 results;
+    # older caches written as float64 are cast once here instead of in every consumer)
+    return np.ascontiguousarray(embeddings, dtype=np.float32) 
\ No newline at end of file
@@ -4,13 +4,52 @@ Main clustering pipeline that orchestrates all components.
 Modular approach allows for easy debugging and component swapping.
 """
 
+import ctypes
+import functools
+import gc
+import hashlib
+import os
 import time
+import numpy as np
 from data_loader import load_graph_from_db, save_results_to_db
-from embeddings import generate_node2vec_embeddings
-from clustering import perform_clustering
-from dimensionality_reduction import project_to_2d
+from embeddings import generate_node2vec_embeddings, edge_list_hash
+from clustering import perform_clustering, to_cupy, CUML_AVAILABLE, CUVS_AVAILABLE
+from dimensionality_reduction import project_to_2d, enable_rmm_pool
 
-def run_full_pipeline(embedding_backend="pecanpy", 
+def release_freed_memory():
+    """
+    Collect garbage and hand freed heap pages back to the OS between stages.
+    
+    glibc keeps freed arena memory mapped, so large intermediates (walk corpora,
+    k-NN graphs) would otherwise stay in RSS for the rest of the run.
+    MALLOC_TRIM_THRESHOLD_ only takes effect at process start, hence malloc_trim.
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # not glibc
+
+def cached(path, compute, use_cache=True):
+    """
+    Load an .npy pipeline artifact (memory-mapped) if it exists, else compute and save it.
+    
+    compute is only called on a miss, so stages whose outputs are all cached never
+    load their inputs.
+    """
+    if use_cache and os.path.exists(path):
+        print(f"🔎 Found pipeline artifact '{path}' – skipping stage")
+        return np.load(path, mmap_mode='r', allow_pickle=False)
+    value = np.asarray(compute())
+    if use_cache:
+        np.save(path, value, allow_pickle=False)
+    return value
+
+def artifact_key(*parts):
+    """Short hash of the parameters an artifact depends on, for its filename."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+def run_full_pipeline(embedding_backend="auto", 
                      clustering_backend="auto",
                      projection_method="umap",
                      projection_backend="auto",
@@ -20,9 +59,13 @@ def run_full_pipeline(embedding_backend="pecanpy",
     """
     Run the complete clustering pipeline.
     
+    Cluster labels and the 2D projection are cached as artifacts keyed by the
+    graph and the stage parameters; embeddings (and their GPU copy) are loaded
+    lazily, so a re-run with both artifacts cached goes straight to the DB write.
+    
     Args:
-        embedding_backend: "pecanpy" or "cugraph"
-        clustering_backend: "cpu", "pytorch", "cuml", or "auto"
+        embedding_backend: "pecanpy", "cugraph", "pyg", or "auto" (cuGraph, then PyG on CUDA, then PecanPy)
+        clustering_backend: "cpu", "pytorch", "cuml", "cuvs", or "auto"
         projection_method: "umap" or "tsne"
         projection_backend: "cpu", "gpu", or "auto" (for UMAP)
         optimal_k: Number of clusters (None for auto-detection with elbow method)
@@ -32,6 +75,7 @@ def run_full_pipeline(embedding_backend="pecanpy",
     start_time = time.time()
     
     print("🚀 Starting modular clustering pipeline...")
+    enable_rmm_pool()  # Before any stage allocates GPU memory
     print(f"   Embedding backend: {embedding_backend}")
     print(f"   Clustering backend: {clustering_backend}")
     print(f"   Projection method: {projection_method}")
@@ -45,39 +89,60 @@ def run_full_pipeline(embedding_backend="pecanpy",
         print("STEP 1: Loading graph data")
         print("="*50)
         paper_ids, paper_to_idx, src_indices, dst_indices = load_graph_from_db()
+        embedding_key = (edge_list_hash(src_indices, dst_indices), len(paper_ids), embedding_backend)
         
-        # Step 2: Generate embeddings
-        print("\n" + "="*50)
-        print("STEP 2: Generating node2vec embeddings")
-        print("="*50)
-        embeddings = generate_node2vec_embeddings(
-            paper_ids, src_indices, dst_indices, 
-            backend=embedding_backend,
-            use_cache=use_cache
-        )
+        # Step 2: Node2vec embeddings, generated (or loaded from cache) on first use
+        @functools.lru_cache(maxsize=None)
+        def get_embeddings():
+            print("\n" + "="*50)
+            print("STEP 2: Generating node2vec embeddings")
+            print("="*50)
+            embeddings = generate_node2vec_embeddings(
+                paper_ids, src_indices, dst_indices, 
+                backend=embedding_backend,
+                use_cache=use_cache
+            )
+            release_freed_memory()
+            return embeddings
+        
+        # Uploaded once on first use; K-means, silhouette and GPU UMAP share the device copy
+        @functools.lru_cache(maxsize=None)
+        def get_cu_embeddings():
+            return to_cupy(get_embeddings()) if CUML_AVAILABLE or CUVS_AVAILABLE else None
         
         # Step 3: Perform clustering
         print("\n" + "="*50)
         print("STEP 3: Performing clustering")
         print("="*50)
-        cluster_labels = perform_clustering(
-            embeddings, 
+        labels_key = artifact_key(*embedding_key, clustering_backend, optimal_k, tuple(k_range))
+        cluster_labels = cached(f"pipeline_labels_{labels_key}.npy", lambda: perform_clustering(
+            get_embeddings(), 
             optimal_k=optimal_k,
             k_range=k_range,
             backend=clustering_backend,
-            use_cache=use_cache
-        )
+            use_cache=use_cache,
+            cu_embeddings=get_cu_embeddings()
+        ), use_cache)
+        
+        release_freed_memory()
         
         # Step 4: Project to 2D
         print("\n" + "="*50)
         print("STEP 4: Projecting to 2D")
         print("="*50)
-        embeddings_2d = project_to_2d(
-            embeddings, 
+        projection_key = artifact_key(*embedding_key, projection_method, projection_backend)
+        embeddings_2d = cached(f"pipeline_2d_{projection_key}.npy", lambda: project_to_2d(
+            get_embeddings(), 
             method=projection_method,
             backend=projection_backend,
-            use_cache=use_cache
-        )
+            use_cache=use_cache,
+            cu_embeddings=get_cu_embeddings()
+        ), use_cache)
+        
+        embeddings_loaded = get_embeddings.cache_info().currsize > 0
+        embeddings = get_embeddings() if embeddings_loaded else None
+        get_cu_embeddings.cache_clear()
+        release_freed_memory()
         
         # Step 5: Save results
         print("\n" + "="*50)
@@ -87,14 +152,17 @@ def run_full_pipeline(embedding_backend="pecanpy",
         
         # Summary
         total_time = time.time() - start_time
-        unique_clusters = len(set(cluster_labels))
+        unique_clusters = len(np.unique(cluster_labels))
         
         print("\n" + "="*50)
         print("PIPELINE COMPLETED SUCCESSFULLY!")
         print("="*50)
         print(f"📊 Results Summary:")
         print(f"   - Papers processed: {len(paper_ids):,}")
-        print(f"   - Embedding dimensions: {embeddings.shape[1]}")
+        if embeddings is not None:
+            print(f"   - Embedding dimensions: {embeddings.shape[1]}")
+        else:
+            print(f"   - Embeddings: not loaded (all downstream artifacts cached)")
         print(f"   - Number of clusters: {unique_clusters}")
         print(f"   - Total processing time: {total_time:.2f} seconds")
         print(f"   - Average time per paper: {total_time/len(paper_ids)*1000:.2f} ms")
@@ -128,7 +196,7 @@ def run_fast_pipeline(use_defaults=False):
 def run_gpu_pipeline():
     """Run pipeline with GPU acceleration where possible."""
     return run_full_pipeline(
-        embedding_backend="pecanpy",
+        embedding_backend="auto",
         clustering_backend="pytorch",
         projection_method="umap", 
         optimal_k=None,
@@ -136,8 +204,12 @@ def run_gpu_pipeline():
     )
 
 if __name__ == "__main__":
+    import logging
     import sys
     
+    # Show the projection module's progress messages the way print() did
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     if len(sys.argv) > 1:
         mode = sys.argv[1]
         if mode == "fast":
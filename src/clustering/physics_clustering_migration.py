@@ -14,46 +14,120 @@ The new table will contain:
 This allows us to compare the old and new clustering approaches side by side.
 """
 
+import functools
 import time
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import sqlite3
 from typing import Dict, List, Tuple, Optional
 import logging
 from pathlib import Path
-import json
-from collections import Counter
 
-# GPU acceleration imports
-try:
-    import cudf
-    import cugraph
-    import cuml
-    from cuml import DBSCAN as cuDBSCAN
-    GPU_AVAILABLE = True
-    print("🚀 GPU acceleration available (RAPIDS)")
-except ImportError:
-    GPU_AVAILABLE = False
-    print("⚠️  GPU acceleration not available, falling back to CPU")
+# Heavy optional backends are imported on first use, so `--compare` and other
+# light entry points do not pay RAPIDS/Numba import time.
+GPU_AVAILABLE = FA2_AVAILABLE = NUMBA_AVAILABLE = FAISS_AVAILABLE = False
+
+@functools.lru_cache(maxsize=None)
+def gpu_backends() -> bool:
+    """Import RAPIDS (binding cudf/cp/cugraph) and faiss GPU once; True if RAPIDS is available."""
+    global cudf, cp, cugraph, faiss, GPU_AVAILABLE, FAISS_AVAILABLE
+    try:
+        import cudf
+        import cupy as cp
+        import cugraph
+        import cuml  # noqa: F401  (HDBSCAN is imported where it is used)
+        GPU_AVAILABLE = True
+        print("🚀 GPU acceleration available (RAPIDS)")
+    except ImportError:
+        GPU_AVAILABLE = False
+        print("⚠️  GPU acceleration not available, falling back to CPU")
+    
+    # faiss GPU brute-force neighbour search (DBSCAN-style clustering of large layouts)
+    try:
+        import faiss
+        FAISS_AVAILABLE = hasattr(faiss, "StandardGpuResources")
+    except ImportError:
+        FAISS_AVAILABLE = False
+    return GPU_AVAILABLE
 
-# CPU fallback imports
-import networkx as nx
-from sklearn.cluster import DBSCAN
-from sklearn.preprocessing import StandardScaler
+@functools.lru_cache(maxsize=None)
+def cpu_backends() -> None:
+    """Import the CPU ForceAtlas2/DBSCAN implementations once and set their flags."""
+    global ForceAtlas2, forceatlas2_numba, dbscan_numba, FA2_AVAILABLE, NUMBA_AVAILABLE
+    try:
+        from fa2 import ForceAtlas2
+        FA2_AVAILABLE = True
+        print("✅ fa2 available for CPU Barnes-Hut ForceAtlas2")
+    except ImportError:
+        FA2_AVAILABLE = False
+        print("⚠️  fa2 not available")
+    
+    try:
+        from fa2_numba import forceatlas2_layout as forceatlas2_numba
+        from dbscan_numba import dbscan as dbscan_numba
+        NUMBA_AVAILABLE = True
+        print("✅ Numba available for CPU Barnes-Hut ForceAtlas2 and DBSCAN")
+    except ImportError:
+        NUMBA_AVAILABLE = False
+        print("⚠️  Numba not available")
 
-# ForceAtlas2 CPU implementations
+# Columnar SQLite reader (straight to Arrow, no per-row Python objects)
 try:
-    import igraph as ig
-    IGRAPH_AVAILABLE = True
-    print("✅ igraph available for CPU ForceAtlas2")
+    import connectorx as cx
+    CONNECTORX_AVAILABLE = True
 except ImportError:
-    IGRAPH_AVAILABLE = False
-    print("⚠️  igraph not available")
+    CONNECTORX_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Result columns of physics_clustering and their values in the staged `updates` table;
+# every other column is copied from filtered_papers
+RESULT_COLUMNS = {
+    'embedding_x': 'updates.ex',
+    'embedding_y': 'updates.ey',
+    'cluster_id': 'updates.cid',
+    'cluster_size': 'updates.csize',
+    'processed_date': ':processed_date',
+}
+
+def to_host(array) -> np.ndarray:
+    """Return a NumPy view of positions or labels that may still live on the GPU."""
+    return array.get() if hasattr(array, "get") else np.asarray(array)
+
+def read_query_to_arrow(db_path: str, query: str, schema: pa.Schema,
+                        batch_size: int = 1_000_000) -> pa.Table:
+    """
+    Run a query and collect its rows into an Arrow table with the given schema.
+    
+    Uses ConnectorX when installed, which fills Arrow buffers natively. Otherwise
+    rows are fetched batch_size at a time, so only one batch of Python row tuples
+    exists at any point. Either way the result is columnar and cuDF can ingest it
+    without a pandas round-trip.
+    """
+    if CONNECTORX_AVAILABLE:
+        table = cx.read_sql(f"sqlite://{Path(db_path).resolve()}", query, return_type="arrow")
+        return table.select(schema.names).cast(schema)
+    
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(query)
+        batches = []
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            batches.append(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+        return pa.Table.from_batches(batches, schema=schema)
+    finally:
+        conn.close()
+
 class PhysicsClusteringMigrator:
     """
     Migrates from Node2Vec+UMAP+KMeans to ForceAtlas2+HDBSCAN clustering
@@ -79,6 +153,7 @@ class PhysicsClusteringMigrator:
                  fa2_scaling_ratio: float = 3.0,    # Optimal for LinLog mode
                  fa2_strong_gravity_mode: bool = False,
                  fa2_gravity: float = 0.1,          # Low gravity for LinLog mode
+                 fa2_coarse_iterations: int = 0,    # >0: coarse theta=1.2 strong-gravity stage first
                  dbscan_eps: float = 0.3,           # Legacy DBSCAN parameter (fallback only)
                  dbscan_min_samples: int = 5,       # Legacy DBSCAN parameter (fallback only)
                  use_gpu: bool = True):
@@ -86,12 +161,18 @@ class PhysicsClusteringMigrator:
         Initialize the physics clustering migrator.
         """
         self.db_path = db_path
-        self.use_gpu = use_gpu and GPU_AVAILABLE
+        self.use_gpu = use_gpu and gpu_backends()
         self.fa2_max_iterations = fa2_max_iterations
         self.fa2_convergence_threshold = fa2_convergence_threshold
         self.fa2_check_interval = fa2_check_interval
+        self.fa2_edge_weight_influence = fa2_edge_weight_influence
+        self.fa2_jitter_tolerance = fa2_jitter_tolerance
+        self.fa2_barnes_hut_optimize = fa2_barnes_hut_optimize
+        self.fa2_barnes_hut_theta = fa2_barnes_hut_theta
         self.fa2_scaling_ratio = fa2_scaling_ratio
+        self.fa2_strong_gravity_mode = fa2_strong_gravity_mode
         self.fa2_gravity = fa2_gravity
+        self.fa2_coarse_iterations = fa2_coarse_iterations
         
         # DBSCAN parameters
         self.dbscan_params = {
@@ -103,165 +184,145 @@ class PhysicsClusteringMigrator:
         logger.info(f"   ForceAtlas2 max iterations: {fa2_max_iterations}, convergence threshold: {fa2_convergence_threshold}")
         logger.info(f"   DBSCAN eps: {dbscan_eps}, min_samples: {dbscan_min_samples}")
     
-    def create_physics_clustering_table(self) -> bool:
-        """
-        Create the physics_clustering table by copying filtered_papers.
-        
-        Returns:
-            True if successful, False otherwise
+    def load_citation_network(self) -> Tuple[pa.Table, pa.Table]:
         """
-        logger.info("📋 Creating physics_clustering table...")
+        Load the citation network from the database as Arrow tables.
         
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Drop existing physics_clustering table if it exists
-            cursor.execute("DROP TABLE IF EXISTS physics_clustering")
-            
-            # Create new table by copying structure and data from filtered_papers
-            cursor.execute("""
-                CREATE TABLE physics_clustering AS 
-                SELECT * FROM filtered_papers
-            """)
-            
-            # Verify the copy
-            result = cursor.execute("SELECT COUNT(*) FROM physics_clustering").fetchone()
-            count = result[0] if result else 0
-            
-            # Create indices for better performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_physics_clustering_id ON physics_clustering(paper_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_physics_clustering_cluster ON physics_clustering(cluster_id)")
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"✅ Successfully created physics_clustering table with {count:,} papers")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to create physics_clustering table: {e}")
-            return False
-    
-    def load_citation_network(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        """
-        Load the citation network from the database.
+        Only paper_id is read for nodes; titles and years are not used by the layout.
         
         Returns:
-            Tuple of (nodes_df, edges_df)
+            Tuple of (nodes, edges) with columns paper_id and src, dst
         """
         logger.info("📊 Loading citation network from database...")
         
-        conn = sqlite3.connect(self.db_path)
-        
         # Load nodes (papers) from filtered_papers
         nodes_query = """
-            SELECT paper_id, title, year
+            SELECT paper_id
             FROM filtered_papers
             ORDER BY paper_id
         """
-        nodes_df = pd.read_sql_query(nodes_query, conn)
+        nodes = read_query_to_arrow(self.db_path, nodes_query, pa.schema([('paper_id', pa.string())]))
         
         # Load edges (citations)
         edges_query = """
             SELECT src, dst
             FROM filtered_citations
         """
-        edges_df = pd.read_sql_query(edges_query, conn)
+        edges = read_query_to_arrow(self.db_path, edges_query, pa.schema([('src', pa.string()), ('dst', pa.string())]))
         
-        conn.close()
-        
-        logger.info(f"📊 Loaded {len(nodes_df):,} nodes and {len(edges_df):,} edges")
-        return nodes_df, edges_df
+        logger.info(f"📊 Loaded {nodes.num_rows:,} nodes and {edges.num_rows:,} edges")
+        return nodes, edges
     
-    def compute_forceatlas2_layout_gpu(self, nodes_df: pd.DataFrame, edges_df: pd.DataFrame) -> np.ndarray:
+    def compute_forceatlas2_layout_gpu(self, nodes: pa.Table, edges: pa.Table):
         """
         Compute ForceAtlas2 layout using GPU acceleration.
+        
+        On the GPU path the (N, 2) positions are returned as a CuPy array so that
+        clustering can consume them without a host round-trip; the CPU fallbacks
+        return NumPy arrays. Use to_host() before handing them to host code.
         """
         if not self.use_gpu:
-            return self.compute_forceatlas2_layout_cpu(nodes_df, edges_df)
+            return self.compute_forceatlas2_layout_cpu(nodes, edges)
         
         logger.info("🚀 Computing ForceAtlas2 layout on GPU...")
         start_time = time.time()
         
         try:
-            # Create integer mapping for cuGraph (required for ForceAtlas2)
-            all_nodes = set(edges_df['src'].tolist() + edges_df['dst'].tolist() + nodes_df['paper_id'].tolist())
-            node_to_int = {node: i for i, node in enumerate(sorted(all_nodes))}
-            int_to_node = {i: node for node, i in node_to_int.items()}
-            
-            # Convert edges to integer IDs
-            edges_int = pd.DataFrame({
-                'src': [node_to_int[src] for src in edges_df['src']],
-                'dst': [node_to_int[dst] for dst in edges_df['dst']]
-            })
-            edges_cudf = cudf.from_pandas(edges_int)
+            # Arrow columns go straight to the device
+            nodes_cudf = cudf.DataFrame.from_arrow(nodes)
+            nodes_cudf['row'] = cp.arange(len(nodes_cudf), dtype=cp.int32)
+            edges_cudf = cudf.DataFrame.from_arrow(edges)
+            
+            # Dense int32 vertex IDs for papers with citations, assigned once so cuGraph
+            # skips its own renumbering; isolated papers stay out of the graph
+            cited = nodes_cudf['paper_id'].isin(edges_cudf['src']) | nodes_cudf['paper_id'].isin(edges_cudf['dst'])
+            connected = nodes_cudf[cited].reset_index(drop=True)
+            connected['idx'] = cp.arange(len(connected), dtype=cp.int32)
+            id_map = connected[['paper_id', 'idx']]
+            edges_int = edges_cudf.merge(
+                id_map.rename(columns={'paper_id': 'src', 'idx': 'src_idx'}), on='src'
+            ).merge(
+                id_map.rename(columns={'paper_id': 'dst', 'idx': 'dst_idx'}), on='dst'
+            )[['src_idx', 'dst_idx']]
+            del edges_cudf
             
             # Create cuGraph (undirected for better layout)
             G = cugraph.Graph(directed=False)
-            G.from_cudf_edgelist(edges_cudf, source='src', destination='dst')
+            G.from_cudf_edgelist(edges_int, source='src_idx', destination='dst_idx', renumber=False)
             
             logger.info(f"📊 Created cuGraph with {G.number_of_vertices():,} vertices and {G.number_of_edges():,} edges")
             
             # Run ForceAtlas2 in single shot  
             positions_cudf = self.run_forceatlas2_single_run(G)
             
-            # Convert back to numpy (cuGraph returns vertex, x, y columns)
-            # Use cuDF operations to avoid CUDA device issues
-            vertices_int = positions_cudf['vertex'].to_arrow().to_pylist()
-            x_coords = positions_cudf['x'].to_arrow().to_pylist()
-            y_coords = positions_cudf['y'].to_arrow().to_pylist()
-            
-            # Create a mapping from integer vertex to position
-            vertex_int_to_pos = {v: [x, y] for v, x, y in zip(vertices_int, x_coords, y_coords)}
-            
-            # Get positions in the same order as nodes_df (convert back to original node IDs)
-            positions = np.array([
-                vertex_int_to_pos.get(node_to_int.get(node_id, -1), [0.0, 0.0]) 
-                for node_id in nodes_df['paper_id']
-            ])
+            # Scatter (vertex, x, y) back to node order in one (V, 2) gather, scaled by 1/1000
+            # on the way; isolated papers stay at the origin. float32 is ample for a 2D
+            # layout and halves HDBSCAN's distance traffic
+            positions_gpu = cp.zeros((len(nodes_cudf), 2), dtype=cp.float32)
+            rows = connected['row'].values[positions_cudf['vertex'].values]
+            positions_gpu[rows] = positions_cudf[['x', 'y']].to_cupy(dtype=cp.float32) * 1e-3
             
             elapsed = time.time() - start_time
             logger.info(f"✅ ForceAtlas2 completed in {elapsed:.2f} seconds")
             
-            # Log coordinate statistics for debugging
-            x_coords = positions[:, 0]
-            y_coords = positions[:, 1]
-            logger.info(f"📊 Coordinate ranges: X[{x_coords.min():.1f}, {x_coords.max():.1f}], Y[{y_coords.min():.1f}, {y_coords.max():.1f}]")
-            logger.info(f"📊 Coordinate spans: X={x_coords.max()-x_coords.min():.1f}, Y={y_coords.max()-y_coords.min():.1f}")
+            # Log coordinate statistics for debugging (one 2x2 copy to the host), in the
+            # layout's original units
+            (x_min, y_min), (x_max, y_max) = to_host(
+                cp.stack([positions_gpu.min(axis=0), positions_gpu.max(axis=0)]) * 1000
+            )
+            logger.info(f"📊 Coordinate ranges: X[{x_min:.1f}, {x_max:.1f}], Y[{y_min:.1f}, {y_max:.1f}]")
+            logger.info(f"📊 Coordinate spans: X={x_max-x_min:.1f}, Y={y_max-y_min:.1f}")
             
-            print("divide positions by 1000")
-            positions = positions / 1000
-            return positions
+            print("divided positions by 1000")
+            return positions_gpu
             
         except Exception as e:
             logger.error(f"❌ GPU ForceAtlas2 failed: {e}")
             logger.info("🔄 Falling back to CPU implementation...")
-            return self.compute_forceatlas2_layout_cpu(nodes_df, edges_df)
+            return self.compute_forceatlas2_layout_cpu(nodes, edges)
     
     def run_forceatlas2_single_run(self, G) -> 'cudf.DataFrame':
         """
         Run ForceAtlas2 in a single shot with proper parameters for 70k node citation graphs.
+        
+        With fa2_coarse_iterations > 0 the run is split in two: a coarse stage with a loose
+        Barnes-Hut approximation (theta=1.2) and strong gravity, then the remaining
+        iterations at the configured theta, starting from the coarse positions.
         """
         num_vertices = G.number_of_vertices()
         num_edges = G.number_of_edges()
         
         # Use recommended parameters for large citation graphs
         iterations = min(2000, self.fa2_max_iterations)  # 2000 is usually enough for convergence
+        coarse_iterations = min(self.fa2_coarse_iterations, iterations)
         
         print(f"🔥 Running ForceAtlas2 for {iterations} iterations on {num_vertices:,} vertices, {num_edges:,} edges")
         
-        try:
-            positions_cudf = cugraph.force_atlas2(
+        def force_atlas2(max_iter, barnes_hut_theta, strong_gravity_mode, pos_list=None):
+            return cugraph.force_atlas2(
                 G,
-                max_iter=iterations,
+                max_iter=max_iter,
+                pos_list=pos_list,
                 scaling_ratio=self.fa2_scaling_ratio,
                 gravity=self.fa2_gravity,
+                strong_gravity_mode=strong_gravity_mode,
                 lin_log_mode=True,         # Logarithmic attraction - favors communities
                 outbound_attraction_distribution=False,  # Hubs attract less, pushed to borders
-                barnes_hut_optimize=True,
+                edge_weight_influence=self.fa2_edge_weight_influence,
+                jitter_tolerance=self.fa2_jitter_tolerance,
+                barnes_hut_optimize=self.fa2_barnes_hut_optimize,
+                barnes_hut_theta=barnes_hut_theta,
                 verbose=False
             )
+        
+        try:
+            pos_list = None
+            if coarse_iterations > 0:
+                print(f"🔥 Coarse stage: {coarse_iterations} iterations at theta=1.2 with strong gravity")
+                pos_list = force_atlas2(coarse_iterations, max(1.2, self.fa2_barnes_hut_theta), True)
+            
+            positions_cudf = force_atlas2(iterations - coarse_iterations, self.fa2_barnes_hut_theta,
+                                          self.fa2_strong_gravity_mode, pos_list)
             
             print(f"✅ ForceAtlas2 completed successfully")
             return positions_cudf
@@ -272,22 +333,39 @@ class PhysicsClusteringMigrator:
     
 
     
-    def compute_forceatlas2_layout_cpu(self, nodes_df: pd.DataFrame, edges_df: pd.DataFrame) -> np.ndarray:
+    def compute_forceatlas2_layout_cpu(self, nodes: pa.Table, edges: pa.Table) -> np.ndarray:
         """
-        Fallback CPU implementation using NetworkX + fa2.
+        Fallback CPU implementation: the parallel Numba Barnes-Hut ForceAtlas2 (LinLog,
+        like the GPU layout), else fa2's Barnes-Hut ForceAtlas2, else NetworkX spring layout.
         """
         logger.info("💻 Computing ForceAtlas2 layout on CPU (fallback)...")
         start_time = time.time()
+        paper_ids = nodes.column('paper_id').to_pylist()
+        cpu_backends()
         
         try:
-            # Create NetworkX graph
-            G = nx.from_pandas_edgelist(edges_df, source='src', target='dst', create_using=nx.DiGraph())
+            if NUMBA_AVAILABLE:
+                logger.info(f"🔥 Running Numba Barnes-Hut ForceAtlas2 for {self.fa2_max_iterations} iterations...")
+                positions = forceatlas2_numba(
+                    self.build_symmetric_adjacency(paper_ids, edges),
+                    iterations=self.fa2_max_iterations,
+                    scaling_ratio=self.fa2_scaling_ratio,
+                    gravity=self.fa2_gravity,
+                    theta=self.fa2_barnes_hut_theta,
+                    lin_log=True
+                )
+                elapsed = time.time() - start_time
+                logger.info(f"✅ CPU ForceAtlas2 completed in {elapsed:.2f} seconds")
+                return positions
+            
+            if FA2_AVAILABLE:
+                return self.run_forceatlas2_cpu(paper_ids, edges, start_time)
             
-            # Add isolated nodes
-            all_nodes = set(nodes_df['paper_id'])
-            graph_nodes = set(G.nodes())
-            isolated_nodes = all_nodes - graph_nodes
-            G.add_nodes_from(isolated_nodes)
+            import networkx as nx
+            
+            # NetworkX graph on integer node codes 0..N-1 in node order (isolated papers
+            # included), so no string node IDs or per-node dict lookups are needed
+            G = nx.from_scipy_sparse_array(self.build_symmetric_adjacency(paper_ids, edges))
             
             logger.info(f"📊 Created NetworkX graph with {G.number_of_nodes():,} nodes and {G.number_of_edges():,} edges")
             
@@ -295,15 +373,13 @@ class PhysicsClusteringMigrator:
             logger.info("🔥 Running NetworkX spring layout algorithm...")
             positions_dict = nx.spring_layout(
                 G, 
-                iterations=min(self.fa2_iterations, 50),  # Limit iterations for performance
+                iterations=min(self.fa2_max_iterations, 50),  # Limit iterations for performance
                 k=1,  # Optimal distance between nodes
                 seed=42  # For reproducibility
             )
             
-            # Convert to numpy array in the same order as nodes_df
-            positions = np.array([[positions_dict.get(node_id, [0.0, 0.0])[0], 
-                                  positions_dict.get(node_id, [0.0, 0.0])[1]] 
-                                 for node_id in nodes_df['paper_id']])
+            # Layout dict follows G's node order, which is already node order
+            positions = np.array(list(positions_dict.values()), dtype=np.float32)
             
             elapsed = time.time() - start_time
             logger.info(f"✅ CPU spring layout completed in {elapsed:.2f} seconds")
@@ -311,23 +387,76 @@ class PhysicsClusteringMigrator:
             return positions
             
         except Exception as e:
-            logger.error(f"❌ CPU spring layout failed: {e}")
-            return self.generate_random_positions(len(nodes_df))
+            logger.error(f"❌ CPU layout failed: {e}")
+            return self.generate_random_positions(len(paper_ids))
+    
+    def build_symmetric_adjacency(self, paper_ids: List[str], edges: pa.Table):
+        """
+        Undirected, unweighted CSR adjacency with rows in paper_ids order.
+        
+        Endpoints are mapped to row indices with one categorical encoding pass;
+        edges to unknown papers are dropped.
+        """
+        import scipy.sparse as sp
+        
+        edges_df = edges.to_pandas()
+        src = pd.Categorical(edges_df['src'], categories=paper_ids).codes
+        dst = pd.Categorical(edges_df['dst'], categories=paper_ids).codes
+        keep = (src >= 0) & (dst >= 0)
+        n_nodes = len(paper_ids)
+        adjacency = sp.coo_matrix((np.ones(int(keep.sum())), (src[keep], dst[keep])), shape=(n_nodes, n_nodes))
+        return ((adjacency + adjacency.T) > 0).astype(np.float64).tocsr()
+    
+    def run_forceatlas2_cpu(self, paper_ids: List[str], edges: pa.Table, start_time: float) -> np.ndarray:
+        """
+        Run Barnes-Hut ForceAtlas2 (fa2) on a symmetric sparse adjacency matrix.
+        
+        The quadtree approximation makes repulsion O(N log N) per iteration instead of
+        O(N²). fa2 has no LinLog mode, so the layout is close to, not identical to, the GPU one.
+        """
+        adjacency = self.build_symmetric_adjacency(paper_ids, edges)
+        n_nodes = len(paper_ids)
+        
+        logger.info(f"🔥 Running Barnes-Hut ForceAtlas2 for {self.fa2_max_iterations} iterations on {n_nodes:,} nodes...")
+        forceatlas2 = ForceAtlas2(
+            outboundAttractionDistribution=False,
+            barnesHutOptimize=True,
+            barnesHutTheta=self.fa2_barnes_hut_theta,
+            scalingRatio=self.fa2_scaling_ratio,
+            gravity=self.fa2_gravity,
+            verbose=False
+        )
+        positions = np.array(forceatlas2.forceatlas2(adjacency, pos=None, iterations=self.fa2_max_iterations),
+                             dtype=np.float32)
+        
+        elapsed = time.time() - start_time
+        logger.info(f"✅ CPU ForceAtlas2 completed in {elapsed:.2f} seconds")
+        
+        return positions
     
-    def generate_random_positions(self, n_nodes: int) -> np.ndarray:
+    def generate_random_positions(self, n_nodes: int):
         """
-        Generate random positions as a last resort fallback.
+        Generate random float32 positions as a last resort fallback.
+        
+        On the GPU path they are drawn directly on the device so they feed HDBSCAN
+        without a host allocation or H2D copy.
         """
         logger.warning("⚠️  Using random positions (ForceAtlas2 failed)")
-        np.random.seed(42)
-        return np.random.randn(n_nodes, 2) * 10
+        if self.use_gpu:
+            rng = cp.random.default_rng(42)
+            return rng.standard_normal((n_nodes, 2), dtype=cp.float32) * 10
+        rng = np.random.default_rng(42)
+        return rng.standard_normal((n_nodes, 2), dtype=np.float32) * 10
     
-    def cluster_positions_gpu(self, positions: np.ndarray) -> np.ndarray:
+    def cluster_positions_gpu(self, positions) -> np.ndarray:
         """
         Perform HDBSCAN clustering on 2D positions using GPU with raw coordinates to preserve density variations.
+        
+        positions may be a CuPy array (GPU layout output, used in place) or a NumPy array;
+        only the label array is copied back to the host.
         """
         if not self.use_gpu:
-            return self.cluster_positions_cpu(positions)
+            return self.cluster_positions_cpu(to_host(positions))
         
         print("🚀 Performing HDBSCAN clustering on GPU with raw coordinates...")
         start_time = time.time()
@@ -335,16 +464,12 @@ class PhysicsClusteringMigrator:
         try:
             # Use raw coordinates to preserve density variations (no standardization!)
             # This is crucial for HDBSCAN to handle variable density properly
-            positions_for_clustering = positions.copy()
+            positions_gpu = cp.asarray(positions, dtype=cp.float32)
             
+            x_min, y_min = to_host(positions_gpu.min(axis=0))
+            x_max, y_max = to_host(positions_gpu.max(axis=0))
             print(f"📊 Using raw coordinates to preserve density variations")
-            print(f"📊 Coordinate ranges: X[{positions[:, 0].min():.1f}, {positions[:, 0].max():.1f}], Y[{positions[:, 1].min():.1f}, {positions[:, 1].max():.1f}]")
-            
-            # Convert to cuDF for GPU processing
-            positions_cudf = cudf.DataFrame({
-                'x': positions_for_clustering[:, 0],
-                'y': positions_for_clustering[:, 1]
-            })
+            print(f"📊 Coordinate ranges: X[{x_min:.1f}, {x_max:.1f}], Y[{y_min:.1f}, {y_max:.1f}]")
             
             # GPU HDBSCAN with optimal parameters for citation networks
             from cuml import HDBSCAN as cuHDBSCAN
@@ -353,31 +478,29 @@ class PhysicsClusteringMigrator:
                 min_samples=5,             # Low threshold for community detection
                 cluster_selection_epsilon=0.0  # Use default selection
             )
-            cluster_labels_cudf = hdbscan.fit_predict(positions_cudf)
-            
-            # Convert to numpy using arrow to avoid CUDA device issues
-            cluster_labels = np.array(cluster_labels_cudf.to_arrow().to_pylist())
+            labels_gpu = cp.asarray(hdbscan.fit_predict(positions_gpu))
             
             elapsed = time.time() - start_time
-            n_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-            n_noise = int(np.sum(cluster_labels == -1))
+            # Histogram on the device (shift so noise -1 lands in bin 0); only the
+            # per-cluster counts cross to the host, not the label array twice
+            counts = to_host(cp.bincount(labels_gpu + 1))
+            n_noise = int(counts[0])
+            cluster_sizes = counts[1:]
+            n_clusters = int(np.count_nonzero(cluster_sizes))
+            cluster_labels = to_host(labels_gpu)
             
             print(f"✅ GPU HDBSCAN completed in {elapsed:.2f} seconds")
             print(f"📊 Found {n_clusters} clusters, {n_noise} noise points")
             
             # Show cluster size distribution
             if n_clusters > 0:
-                from collections import Counter
-                cluster_sizes = Counter(cluster_labels)
-                if -1 in cluster_sizes:
-                    del cluster_sizes[-1]  # Remove noise
-                largest_cluster_size = max(cluster_sizes.values()) if cluster_sizes else 0
+                largest_cluster_size = int(cluster_sizes.max())
                 largest_ratio = largest_cluster_size / len(positions)
                 print(f"📊 Largest cluster: {largest_cluster_size} papers ({largest_ratio:.1%})")
                 
                 # Show top 5 cluster sizes
-                top_clusters = cluster_sizes.most_common(5)
-                top_str = ", ".join([f"{size}" for _, size in top_clusters])
+                top_sizes = np.sort(cluster_sizes)[::-1][:5]
+                top_str = ", ".join([f"{size}" for size in top_sizes])
                 print(f"📊 Top cluster sizes: {top_str}")
             
             return cluster_labels
@@ -385,34 +508,160 @@ class PhysicsClusteringMigrator:
         except Exception as e:
             print(f"❌ GPU HDBSCAN failed: {e}")
             print("🔄 Falling back to CPU HDBSCAN...")
-            return self.cluster_positions_cpu(positions)
+            return self.cluster_positions_cpu(to_host(positions))
+    
+    def run_hdbscan_sweep(self, positions, param_grid: List[Tuple[int, int]],
+                          max_concurrent: int = 4) -> Dict[Tuple[int, int], np.ndarray]:
+        """
+        Cluster one layout with several (min_cluster_size, min_samples) settings.
+        
+        On the GPU the layout is moved to the device once and each setting is fit from
+        its own thread with its own cuML handle and CUDA stream, so the small 2D fits
+        can overlap instead of queueing behind each other. Returns host label arrays
+        keyed by setting.
+        """
+        print(f"🔍 Sweeping {len(param_grid)} HDBSCAN settings...")
+        start_time = time.time()
+        
+        if not self.use_gpu:
+            import hdbscan
+            positions = to_host(positions)
+            return {
+                (min_cluster_size, min_samples): hdbscan.HDBSCAN(
+                    min_cluster_size=min_cluster_size, min_samples=min_samples,
+                    algorithm='boruvka_kdtree', approx_min_span_tree=True, core_dist_n_jobs=-1
+                ).fit_predict(positions)
+                for min_cluster_size, min_samples in param_grid
+            }
+        
+        from concurrent.futures import ThreadPoolExecutor
+        from cuml import HDBSCAN as cuHDBSCAN
+        from pylibraft.common import Handle, Stream
+        
+        positions_gpu = cp.asarray(positions, dtype=cp.float32)
+        
+        def fit(params):
+            min_cluster_size, min_samples = params
+            handle = Handle(stream=Stream())
+            labels = cuHDBSCAN(
+                min_cluster_size=min_cluster_size,
+                min_samples=min_samples,
+                handle=handle
+            ).fit_predict(positions_gpu)
+            handle.sync()
+            return to_host(labels)
+        
+        with ThreadPoolExecutor(max_workers=max_concurrent) as pool:
+            results = dict(zip(param_grid, pool.map(fit, param_grid)))
+        
+        print(f"✅ HDBSCAN sweep completed in {time.time() - start_time:.2f} seconds")
+        return results
+    
+    def cluster_positions_faiss(self, positions, eps: Optional[float] = None,
+                                min_samples: Optional[int] = None,
+                                max_neighbors: int = 64) -> np.ndarray:
+        """
+        DBSCAN-style clustering of 2D positions using a faiss GPU neighbour search.
+        
+        GPU faiss indexes have no range_search, so each point's eps-neighbourhood is
+        taken from its max_neighbors nearest neighbours (exact in sparse regions,
+        truncated in dense ones where connectivity is unaffected). Points with at least
+        min_samples neighbours within eps are core points; the eps graph between core
+        points is split with cuGraph connected components and border points join the
+        cluster of their nearest core neighbour. Noise stays -1.
+        """
+        if not (self.use_gpu and FAISS_AVAILABLE):
+            logger.warning("⚠️  faiss GPU not available, using HDBSCAN instead")
+            return self.cluster_positions_gpu(positions)
+        
+        eps = self.dbscan_params['eps'] if eps is None else eps
+        min_samples = self.dbscan_params['min_samples'] if min_samples is None else min_samples
+        k = max(max_neighbors, min_samples)
+        
+        print(f"🚀 Performing faiss GPU DBSCAN (eps={eps}, min_samples={min_samples}, k={k})...")
+        start_time = time.time()
+        
+        # Exact L2 kNN on the GPU; results are sorted by distance (squared L2)
+        positions_f32 = np.ascontiguousarray(to_host(positions), dtype=np.float32)
+        n = len(positions_f32)
+        res = faiss.StandardGpuResources()
+        index = faiss.GpuIndexFlatL2(res, 2)
+        index.add(positions_f32)
+        distances, neighbors = index.search(positions_f32, k)
+        
+        distances = cp.asarray(distances)
+        neighbors = cp.asarray(neighbors, dtype=cp.int32)
+        valid = neighbors >= 0
+        neighbors = cp.where(valid, neighbors, 0)
+        
+        # As in sklearn, a point's neighbourhood includes the point itself
+        within = valid & (distances <= eps * eps)
+        is_core = cp.count_nonzero(within, axis=1) >= min_samples
+        core_neighbor = within & is_core[neighbors]
+        if not bool(is_core.any()):
+            logger.warning("⚠️  No core points at this eps/min_samples; all points are noise")
+            return np.full(n, -1, dtype=np.int32)
+        
+        # Connected components of the eps graph restricted to core points
+        rows = cp.broadcast_to(cp.arange(n, dtype=cp.int32)[:, None], neighbors.shape)
+        core_edges = core_neighbor & is_core[:, None]
+        edges = cudf.DataFrame({'src': rows[core_edges], 'dst': neighbors[core_edges]})
+        graph = cugraph.Graph()
+        graph.from_cudf_edgelist(edges, source='src', destination='dst', renumber=False)
+        components = cugraph.connected_components(graph)
+        
+        component_of = cp.full(n, -1, dtype=cp.int64)
+        component_of[components['vertex'].values] = components['labels'].values
+        labels_gpu = cp.full(n, -1, dtype=cp.int32)
+        _, dense_ids = cp.unique(component_of[is_core], return_inverse=True)
+        labels_gpu[is_core] = dense_ids.ravel()
+        
+        # Border points take the label of their nearest core neighbour within eps
+        border = ~is_core & core_neighbor.any(axis=1)
+        nearest_core = neighbors[cp.arange(n), cp.argmax(core_neighbor, axis=1)]
+        labels_gpu[border] = labels_gpu[nearest_core[border]]
+        
+        elapsed = time.time() - start_time
+        n_noise = int(cp.count_nonzero(labels_gpu == -1))
+        n_clusters = int(labels_gpu.max()) + 1 if n > 0 else 0
+        print(f"✅ faiss GPU DBSCAN completed in {elapsed:.2f} seconds")
+        print(f"📊 Found {n_clusters} clusters, {n_noise} noise points")
+        
+        return to_host(labels_gpu)
     
     def cluster_positions_cpu(self, positions: np.ndarray) -> np.ndarray:
         """
         Fallback CPU HDBSCAN clustering.
+        
+        Positions are clustered as float32 (a no-op for the layouts, which are already
+        float32), halving the bytes the tree build and neighbour queries stream.
         """
         logger.info("💻 Performing HDBSCAN clustering on CPU...")
         start_time = time.time()
+        positions = np.asarray(positions, dtype=np.float32)
         
         try:
             # Try to use CPU HDBSCAN
             import hdbscan
             
-            # Use raw coordinates (no standardization for HDBSCAN)
-            positions_for_clustering = positions.copy()
+            # Use raw coordinates (no standardization for HDBSCAN); fit does not modify them
             logger.info("📊 Using raw coordinates to preserve density variations")
             
-            # CPU HDBSCAN with same parameters as GPU version
+            # CPU HDBSCAN with same parameters as GPU version; the Boruvka KD-tree MST
+            # is the fast path for 2D points and computes core distances on all cores
             clusterer = hdbscan.HDBSCAN(
                 min_cluster_size=100,
                 min_samples=5,
-                cluster_selection_epsilon=0.0
+                cluster_selection_epsilon=0.0,
+                algorithm='boruvka_kdtree',
+                approx_min_span_tree=True,
+                core_dist_n_jobs=-1
             )
-            cluster_labels = clusterer.fit_predict(positions_for_clustering)
+            cluster_labels = clusterer.fit_predict(positions)
             
             elapsed = time.time() - start_time
-            n_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-            n_noise = list(cluster_labels).count(-1)
+            n_noise = int(np.count_nonzero(cluster_labels == -1))
+            n_clusters = int(np.unique(cluster_labels).size) - int(n_noise > 0)
             
             logger.info(f"✅ CPU HDBSCAN completed in {elapsed:.2f} seconds")
             logger.info(f"📊 Found {n_clusters} clusters, {n_noise} noise points")
@@ -422,20 +671,29 @@ class PhysicsClusteringMigrator:
         except ImportError:
             logger.warning("⚠️  HDBSCAN not available, falling back to DBSCAN...")
             # Fallback to DBSCAN if HDBSCAN not available
-            from sklearn.preprocessing import StandardScaler
-            from sklearn.cluster import DBSCAN
+            # Standardize positions for DBSCAN (one N×2 buffer, scaled in place)
+            positions_scaled = positions - positions.mean(axis=0)
+            std = positions_scaled.std(axis=0)
+            positions_scaled /= np.where(std > 0, std, 1.0)
             
-            # Standardize positions for DBSCAN
-            scaler = StandardScaler()
-            positions_scaled = scaler.fit_transform(positions)
-            
-            # CPU DBSCAN
-            dbscan = DBSCAN(**self.dbscan_params)
-            cluster_labels = dbscan.fit_predict(positions_scaled)
+            eps = self.dbscan_params['eps']
+            cpu_backends()
+            if NUMBA_AVAILABLE:
+                # KD-tree neighbour pairs + JIT-compiled cluster expansion
+                cluster_labels = dbscan_numba(positions_scaled, eps, self.dbscan_params['min_samples'])
+            else:
+                # CPU DBSCAN on a sparse eps-radius graph from a parallel KD-tree search, so
+                # memory stays O(N * neighbours) instead of risking dense pairwise distances
+                from sklearn.cluster import DBSCAN
+                from sklearn.neighbors import NearestNeighbors
+                neighbors = NearestNeighbors(radius=eps, algorithm='kd_tree', n_jobs=-1).fit(positions_scaled)
+                radius_graph = neighbors.radius_neighbors_graph(positions_scaled, mode='distance')
+                dbscan = DBSCAN(eps=eps, min_samples=self.dbscan_params['min_samples'], metric='precomputed', n_jobs=-1)
+                cluster_labels = dbscan.fit_predict(radius_graph)
             
             elapsed = time.time() - start_time
-            n_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-            n_noise = list(cluster_labels).count(-1)
+            n_noise = int(np.count_nonzero(cluster_labels == -1))
+            n_clusters = int(np.unique(cluster_labels).size) - int(n_noise > 0)
             
             logger.info(f"✅ CPU DBSCAN completed in {elapsed:.2f} seconds")
             logger.info(f"📊 Found {n_clusters} clusters, {n_noise} noise points")
@@ -444,89 +702,115 @@ class PhysicsClusteringMigrator:
     
     def save_physics_results_to_db(self, paper_ids: List[str], positions: np.ndarray, cluster_labels: np.ndarray) -> bool:
         """
-        Save the physics-based clustering results to the physics_clustering table.
+        Save the physics-based clustering results as a fresh physics_clustering table.
+        
+        The results are staged in a temp table and the table is rebuilt from filtered_papers
+        with one INSERT ... SELECT ... LEFT JOIN into an empty typed copy, so no row is ever
+        updated in place; indices are built once afterwards. positions is the float32 (N, 2) layout
+        and may still be on the GPU, as may cluster_labels; SQLite stores the values as REAL.
         """
         logger.info("💾 Saving physics clustering results to database...")
         
         max_retries = 3
         
-        for attempt in range(max_retries):
-            try:
-                conn = sqlite3.connect(self.db_path, timeout=30.0)
-                
-                # Set pragmas for better concurrency
-                conn.execute("PRAGMA journal_mode=WAL")
-                conn.execute("PRAGMA synchronous=NORMAL")
-                conn.execute("PRAGMA temp_store=memory")
-                conn.execute("PRAGMA mmap_size=268435456")  # 256MB
-                
-                # Calculate cluster sizes
-                cluster_sizes = Counter(cluster_labels)
-                
-                # Update the physics_clustering table with results
-                logger.info(f"📝 Updating {len(paper_ids)} papers with physics clustering results...")
-                
-                # Use batch updates for better performance
-                batch_size = 1000
-                current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                
-                for i in range(0, len(paper_ids), batch_size):
-                    batch_end = min(i + batch_size, len(paper_ids))
-                    batch_updates = []
+        positions = to_host(positions)
+        cluster_labels = to_host(cluster_labels)
+        if positions.ndim != 2 or positions.shape[1] != 2 or not len(paper_ids) == len(positions) == len(cluster_labels):
+            logger.error(f"❌ Result shapes do not match: {len(paper_ids)} paper_ids, "
+                         f"positions {positions.shape}, labels {cluster_labels.shape}")
+            return False
+        
+        # Per-row values are computed once with array ops: cluster size is a gather from
+        # a bincount histogram (labels shifted by one so noise -1 uses bin 0)
+        shifted = cluster_labels + 1
+        sizes_per_row = np.bincount(shifted)[shifted]
+        current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+        columns = (
+            paper_ids,
+            positions[:, 0].tolist(),
+            positions[:, 1].tolist(),
+            cluster_labels.tolist(),
+            sizes_per_row.tolist(),
+        )
+        
+        # Connection and pragmas are set up once and reused across retries. physics_clustering
+        # is a derived table that can be regenerated, so skip fsyncs and give the write a
+        # 256MB page cache; WAL stays on so other readers of the database are unaffected
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-262144")  # 256MB (negative = KiB)
+        conn.execute("PRAGMA temp_store=memory")
+        conn.execute("PRAGMA mmap_size=268435456")  # 256MB
+        
+        # Keep filtered_papers' column order; papers without a result keep their own values
+        paper_columns = [row[1] for row in conn.execute("PRAGMA table_info(filtered_papers)")]
+        missing = set(RESULT_COLUMNS) - set(paper_columns)
+        if missing:
+            logger.error(f"❌ filtered_papers is missing result columns: {sorted(missing)}")
+            conn.close()
+            return False
+        select_list = [
+            f"CASE WHEN updates.paper_id IS NULL THEN fp.{name} ELSE {RESULT_COLUMNS[name]} END"
+            if name in RESULT_COLUMNS else f"fp.{name}"
+            for name in paper_columns
+        ]
+        
+        try:
+            for attempt in range(max_retries):
+                try:
+                    logger.info(f"📝 Writing physics clustering results for {len(paper_ids)} papers...")
                     
-                    for j in range(i, batch_end):
-                        paper_id = paper_ids[j]
-                        cluster_id = int(cluster_labels[j])
-                        cluster_size = cluster_sizes[cluster_id]
-                        
-                        batch_updates.append((
-                            float(positions[j, 0]), 
-                            float(positions[j, 1]), 
-                            cluster_id,
-                            cluster_size,
-                            current_time,
-                            paper_id
-                        ))
+                    # Stage all new values in a temp table, then rebuild the table with one
+                    # sequential INSERT ... SELECT, all in a single transaction
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute("DROP TABLE IF EXISTS temp.updates")
+                    conn.execute("""
+                        CREATE TEMP TABLE updates(
+                            paper_id TEXT PRIMARY KEY, ex REAL, ey REAL, cid INTEGER, csize INTEGER
+                        )
+                    """)
+                    conn.executemany("INSERT INTO updates VALUES (?, ?, ?, ?, ?)", zip(*columns))
+                    # Empty copy first so the column types of filtered_papers are kept
+                    conn.execute("DROP TABLE IF EXISTS physics_clustering")
+                    conn.execute("CREATE TABLE physics_clustering AS SELECT * FROM filtered_papers WHERE 0")
+                    conn.execute(f"""
+                        INSERT INTO physics_clustering
+                        SELECT {', '.join(select_list)}
+                        FROM filtered_papers fp
+                        LEFT JOIN updates ON fp.paper_id = updates.paper_id
+                    """, {'processed_date': current_time})
+                    conn.execute("DROP TABLE updates")
+                    conn.execute("CREATE INDEX idx_physics_clustering_id ON physics_clustering(paper_id)")
+                    conn.execute("CREATE INDEX idx_physics_clustering_cluster ON physics_clustering(cluster_id)")
+                    conn.execute("COMMIT")
+                    conn.execute("ANALYZE physics_clustering")
+                    logger.info(f"✅ Successfully saved results for {len(paper_ids):,} papers to physics_clustering table")
                     
-                    conn.executemany("""
-                        UPDATE physics_clustering 
-                        SET embedding_x = ?, embedding_y = ?, cluster_id = ?, 
-                            cluster_size = ?, processed_date = ?
-                        WHERE paper_id = ?
-                    """, batch_updates)
+                    # Verify the save
+                    result = conn.execute("SELECT COUNT(*) FROM physics_clustering WHERE cluster_id IS NOT NULL").fetchone()
+                    saved_count = result[0] if result else 0
+                    logger.info(f"✅ Verification: {saved_count:,} papers now have physics clustering results")
                     
-                    if (i // batch_size + 1) % 10 == 0:
-                        logger.info(f"   📝 Processed {batch_end:,}/{len(paper_ids):,} papers...")
-                
-                conn.commit()
-                logger.info(f"✅ Successfully saved results for {len(paper_ids):,} papers to physics_clustering table")
-                
-                # Verify the save
-                result = conn.execute("SELECT COUNT(*) FROM physics_clustering WHERE cluster_id IS NOT NULL").fetchone()
-                saved_count = result[0] if result else 0
-                logger.info(f"✅ Verification: {saved_count:,} papers now have physics clustering results")
-                
-                conn.close()
-                return True
-                
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e).lower() and attempt < max_retries - 1:
-                    logger.warning(f"⚠️  Database locked, retrying in {2 ** attempt} seconds... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    logger.error(f"❌ Failed to save to database: {e}")
+                    return True
+                    
+                except sqlite3.OperationalError as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    if "database is locked" in str(e).lower() and attempt < max_retries - 1:
+                        logger.warning(f"⚠️  Database locked, retrying in {2 ** attempt} seconds... (attempt {attempt + 1}/{max_retries})")
+                        time.sleep(2 ** attempt)
+                        continue
+                    else:
+                        logger.error(f"❌ Failed to save to database: {e}")
+                        return False
+                except Exception as e:
+                    logger.error(f"❌ Unexpected error saving to database: {e}")
+                    import traceback
+                    traceback.print_exc()
                     return False
-            except Exception as e:
-                logger.error(f"❌ Unexpected error saving to database: {e}")
-                import traceback
-                traceback.print_exc()
-                return False
-            finally:
-                try:
-                    conn.close()
-                except:
-                    pass
+        finally:
+            conn.close()
         
         logger.error(f"❌ Failed to save to database after {max_retries} attempts")
         return False
@@ -544,22 +828,19 @@ class PhysicsClusteringMigrator:
         total_start_time = time.time()
         
         try:
-            # Step 1: Create the physics_clustering table
-            if not self.create_physics_clustering_table():
-                return False
-            
-            # Step 2: Load data (all papers)
-            nodes_df, edges_df = self.load_citation_network()
-            print(f"📊 Loaded {len(nodes_df):,} nodes and {len(edges_df):,} edges")
+            # Step 1: Load data (all papers)
+            nodes, edges = self.load_citation_network()
+            print(f"📊 Loaded {nodes.num_rows:,} nodes and {edges.num_rows:,} edges")
             
-            # Step 3: Compute ForceAtlas2 layout
-            positions = self.compute_forceatlas2_layout_gpu(nodes_df, edges_df)
+            # Step 2: Compute ForceAtlas2 layout
+            positions = self.compute_forceatlas2_layout_gpu(nodes, edges)
             
-            # Step 4: Cluster positions with HDBSCAN
+            # Step 3: Cluster positions with HDBSCAN
             cluster_labels = self.cluster_positions_gpu(positions)
             
-            # Step 5: Save results to physics_clustering table (keep noise points as -1)
-            paper_ids = nodes_df['paper_id'].tolist()
+            # Step 4: Save results to physics_clustering table, rebuilt from filtered_papers
+            # (keep noise points as -1)
+            paper_ids = nodes.column('paper_id').to_pylist()
             success = self.save_physics_results_to_db(paper_ids, positions, cluster_labels)
             
             if success:
@@ -567,12 +848,15 @@ class PhysicsClusteringMigrator:
                 logger.info("🎉 Physics-Based Clustering Migration Complete!")
                 logger.info(f"⏱️  Total time: {total_elapsed:.2f} seconds")
                 logger.info(f"📊 Processed {len(paper_ids):,} papers")
-                logger.info(f"📊 Generated {len(set(cluster_labels))} clusters")
                 
-                # Print cluster size distribution
-                cluster_sizes = pd.Series(cluster_labels).value_counts().sort_index()
+                # Cluster size distribution via bincount (noise -1 shifted into bin 0)
+                counts = np.bincount(np.asarray(cluster_labels) + 1)
+                cluster_ids = np.flatnonzero(counts)
+                cluster_sizes = counts[cluster_ids]
+                cluster_ids -= 1
+                logger.info(f"📊 Generated {len(cluster_ids)} clusters")
                 logger.info("📊 Cluster size distribution:")
-                for cluster_id, size in cluster_sizes.head(10).items():
+                for cluster_id, size in zip(cluster_ids[:10], cluster_sizes[:10]):
                     logger.info(f"   Cluster {cluster_id}: {size:,} papers")
                 
                 if len(cluster_sizes) > 10:
@@ -602,14 +886,14 @@ class PhysicsClusteringMigrator:
         
         # Load both clustering results
         old_query = """
-            SELECT paper_id, cluster_id, embedding_x, embedding_y, cluster_size
+            SELECT paper_id, cluster_id
             FROM filtered_papers 
             WHERE cluster_id IS NOT NULL
         """
         old_df = pd.read_sql_query(old_query, conn)
         
         new_query = """
-            SELECT paper_id, cluster_id, embedding_x, embedding_y, cluster_size
+            SELECT paper_id, cluster_id
             FROM physics_clustering 
             WHERE cluster_id IS NOT NULL AND cluster_id >= 0
         """
@@ -633,22 +917,31 @@ class PhysicsClusteringMigrator:
         
         def calculate_intra_cluster_density(clustering_df, citations_df):
             """Calculate intra-cluster citation density for a clustering result."""
-            paper_to_cluster = dict(zip(clustering_df['paper_id'], clustering_df['cluster_id']))
+            if self.use_gpu:
+                # Two hash joins attach the cluster of each endpoint (inner joins drop
+                # citations touching unclustered papers), then one vectorized comparison
+                cluster_map = cudf.from_pandas(clustering_df[['paper_id', 'cluster_id']])
+                joined = cudf.from_pandas(citations_df).merge(
+                    cluster_map.rename(columns={'paper_id': 'src', 'cluster_id': 'src_cluster'}), on='src'
+                ).merge(
+                    cluster_map.rename(columns={'paper_id': 'dst', 'cluster_id': 'dst_cluster'}), on='dst'
+                )
+                total_citations = len(joined)
+                intra_cluster_citations = int((joined['src_cluster'] == joined['dst_cluster']).sum())
+                return intra_cluster_citations / total_citations if total_citations > 0 else 0
             
-            intra_cluster_citations = 0
-            inter_cluster_citations = 0
-            
-            for _, row in citations_df.iterrows():
-                src_cluster = paper_to_cluster.get(row['src'])
-                dst_cluster = paper_to_cluster.get(row['dst'])
-                
-                if src_cluster is not None and dst_cluster is not None:
-                    if src_cluster == dst_cluster:
-                        intra_cluster_citations += 1
-                    else:
-                        inter_cluster_citations += 1
+            # CPU: encode endpoints as codes into the clustered paper IDs (one hash pass
+            # each, -1 for unclustered papers), then gather clusters from a dense array
+            if len(clustering_df) == 0:
+                return 0
+            paper_ids = pd.Index(clustering_df['paper_id'])
+            clusters = clustering_df['cluster_id'].to_numpy(dtype=np.int32)
+            src = pd.Categorical(citations_df['src'], categories=paper_ids).codes
+            dst = pd.Categorical(citations_df['dst'], categories=paper_ids).codes
+            valid = (src >= 0) & (dst >= 0)
             
-            total_citations = intra_cluster_citations + inter_cluster_citations
+            total_citations = int(np.count_nonzero(valid))
+            intra_cluster_citations = int(np.count_nonzero(clusters[src[valid]] == clusters[dst[valid]]))
             return intra_cluster_citations / total_citations if total_citations > 0 else 0
         
         # Calculate metrics for both approaches
@@ -736,7 +1029,8 @@ def main():
         fa2_gravity=args.gravity,
         dbscan_eps=args.dbscan_eps,
         dbscan_min_samples=args.dbscan_min_samples,
-        use_gpu=not args.no_gpu
+        # Comparison only needs SQLite and pandas; skip importing RAPIDS for it
+        use_gpu=not (args.no_gpu or args.compare)
     )
     
     if args.compare:
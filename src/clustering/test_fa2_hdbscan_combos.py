@@ -8,16 +8,16 @@ import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
-from physics_clustering_migration import PhysicsClusteringMigrator
+from physics_clustering_migration import PhysicsClusteringMigrator, to_host
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from collections import Counter
+from matplotlib.collections import LineCollection
 from sklearn.preprocessing import StandardScaler
 
 # GPU HDBSCAN
 try:
-    import cudf
+    import cupy as cp
     import cuml
     from cuml import HDBSCAN as cuHDBSCAN
     GPU_AVAILABLE = True
@@ -35,7 +35,7 @@ except ImportError:
     CPU_HDBSCAN_AVAILABLE = False
     print("❌ HDBSCAN not available - install with: pip install hdbscan")
 
-def run_fa2_fixed_params(migrator, nodes_df, edges_df):
+def run_fa2_fixed_params(migrator, nodes, edges):
     """Run ForceAtlas2 with the chosen parameters: scaling=3.0, gravity=0.1"""
     
     print("🚀 Running ForceAtlas2 with scaling_ratio=3.0, gravity=0.1, LinLog mode...")
@@ -48,7 +48,7 @@ def run_fa2_fixed_params(migrator, nodes_df, edges_df):
         use_gpu=GPU_AVAILABLE
     )
     
-    positions = temp_migrator.compute_forceatlas2_layout_gpu(nodes_df, edges_df)
+    positions = to_host(temp_migrator.compute_forceatlas2_layout_gpu(nodes, edges))
     
     # Log coordinate statistics
     x_coords = positions[:, 0]
@@ -70,29 +70,26 @@ def run_hdbscan_with_params(positions, min_cluster_size, min_samples, cluster_se
     
     if use_raw_coords:
         # Use raw coordinates to preserve density variations
-        positions_for_clustering = positions.copy()
+        positions_for_clustering = positions.astype(np.float32)
         print(f"   📊 Using raw coordinates (preserving density variations)")
     else:
         # Standardize positions (may flatten density variations)
         scaler = StandardScaler()
-        positions_for_clustering = scaler.fit_transform(positions)
+        positions_for_clustering = scaler.fit_transform(positions).astype(np.float32, copy=False)
         print(f"   📊 Using standardized coordinates")
     
     if GPU_AVAILABLE:
         # GPU HDBSCAN
         print(f"   🚀 Running GPU HDBSCAN...")
-        positions_cudf = cudf.DataFrame({
-            'x': positions_for_clustering[:, 0],
-            'y': positions_for_clustering[:, 1]
-        })
+        positions_gpu = cp.asarray(positions_for_clustering, dtype=cp.float32)
         
         clusterer = cuHDBSCAN(
             min_cluster_size=min_cluster_size,
             min_samples=min_samples,
             cluster_selection_epsilon=cluster_selection_epsilon
         )
-        cluster_labels_cudf = clusterer.fit_predict(positions_cudf)
-        cluster_labels = np.array(cluster_labels_cudf.to_arrow().to_pylist())
+        # CuPy in, CuPy out: labels come back with one device-to-host copy
+        cluster_labels = to_host(cp.asarray(clusterer.fit_predict(positions_gpu)))
         
     elif CPU_HDBSCAN_AVAILABLE:
         # CPU HDBSCAN
@@ -124,21 +121,19 @@ def create_cluster_visualization(positions, cluster_labels, edges_df, nodes_df,
     # Plot edges (sample for performance)
     edge_sample_size = min(25000, len(edges_df))  # Limit edges for visualization
     if len(edges_df) > 0:
-        # Create position lookup
-        paper_to_pos = {paper_id: pos for paper_id, pos in zip(nodes_df['paper_id'], positions)}
-        
         # Sample edges for visualization
         edges_sample = edges_df.sample(n=edge_sample_size, random_state=42)
         
-        for _, edge in edges_sample.iterrows():
-            src_pos = paper_to_pos.get(edge['src'])
-            dst_pos = paper_to_pos.get(edge['dst'])
-            if src_pos is not None and dst_pos is not None:
-                ax.plot([src_pos[0], dst_pos[0]], [src_pos[1], dst_pos[1]], 
-                       color='gray', alpha=0.005, linewidth=0.1)
+        # Endpoint rows via categorical codes against the node order (-1 = unknown paper),
+        # drawn as one LineCollection instead of one plot call per edge
+        src = pd.Categorical(edges_sample['src'], categories=nodes_df['paper_id']).codes
+        dst = pd.Categorical(edges_sample['dst'], categories=nodes_df['paper_id']).codes
+        keep = (src >= 0) & (dst >= 0)
+        segments = np.stack([positions[src[keep]], positions[dst[keep]]], axis=1)
+        ax.add_collection(LineCollection(segments, colors='gray', alpha=0.005, linewidths=0.1))
     
     # Plot nodes colored by cluster
-    unique_clusters = sorted(set(cluster_labels))
+    unique_clusters = np.unique(cluster_labels).tolist()
     n_clusters = len(unique_clusters) - (1 if -1 in unique_clusters else 0)
     
     # Use a colormap that can handle many clusters
@@ -202,20 +197,21 @@ def create_cluster_visualization(positions, cluster_labels, edges_df, nodes_df,
 def analyze_clustering_results(cluster_labels):
     """Analyze HDBSCAN clustering results and return statistics."""
     
-    n_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-    n_noise = int(np.sum(cluster_labels == -1))
+    # One histogram for everything (noise -1 shifted into bin 0)
+    counts = np.bincount(np.asarray(cluster_labels) + 1)
+    cluster_sizes = counts[1:]
+    n_clusters = int(np.count_nonzero(cluster_sizes))
+    n_noise = int(counts[0])
     total_papers = len(cluster_labels)
     noise_ratio = n_noise / total_papers
     
     if n_clusters > 0:
-        cluster_sizes = Counter(cluster_labels)
-        if -1 in cluster_sizes:
-            del cluster_sizes[-1]  # Remove noise from size calculation
-        largest_cluster_size = max(cluster_sizes.values()) if cluster_sizes else 0
+        largest_cluster_size = int(cluster_sizes.max())
         largest_cluster_ratio = largest_cluster_size / total_papers
         
-        # Get top 5 cluster sizes
-        top_clusters = cluster_sizes.most_common(5)
+        # Get top 5 cluster sizes as (cluster_id, size)
+        top_ids = np.argsort(-cluster_sizes, kind='stable')[:5]
+        top_clusters = [(int(cluster_id), int(cluster_sizes[cluster_id])) for cluster_id in top_ids]
     else:
         largest_cluster_ratio = 0
         top_clusters = []
@@ -243,12 +239,13 @@ def main():
     
     # Create migrator and load data
     migrator = PhysicsClusteringMigrator(use_gpu=GPU_AVAILABLE)
-    nodes_df, edges_df = migrator.load_citation_network()
+    nodes, edges = migrator.load_citation_network()
+    nodes_df, edges_df = nodes.to_pandas(), edges.to_pandas()  # for plotting
     
     print(f"📊 Loaded {len(nodes_df):,} nodes, {len(edges_df):,} edges")
     
     # Run ForceAtlas2 with fixed good parameters
-    positions = run_fa2_fixed_params(migrator, nodes_df, edges_df)
+    positions = run_fa2_fixed_params(migrator, nodes, edges)
     
     # Test different HDBSCAN parameter combinations
     hdbscan_params = [
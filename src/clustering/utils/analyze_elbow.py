@@ -3,21 +3,39 @@
 Analyze and visualize the precise elbow method results.
 """
 
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from kneed import KneeLocator
+from data_loader import content_hash
+from clustering import elbow_cache_file, inertia_backend
 
-def analyze_elbow_results():
-    """Analyze the precise elbow results and create visualizations."""
-    
-    # Check if results are ready
-    try:
-        results = np.load('elbow_search_k10-100_papers60534.npy')
-        k_values, inertias = results[0], results[1]
-        print(f"✅ Loaded precise elbow results: {len(k_values)} k values tested")
-    except FileNotFoundError:
-        print("❌ Elbow results not found. Run the elbow analysis first.")
+def analyze_elbow_results(embeddings):
+    """
+    Analyze the precise elbow results and create visualizations.
+    
+    embeddings: the embeddings the elbow search ran on (array or .npy path), or
+    their content hash; only the inertia cache for that hash is used.
+    """
+    if isinstance(embeddings, str) and not os.path.exists(embeddings):
+        embeddings_hash = embeddings
+    else:
+        if isinstance(embeddings, str):
+            embeddings = np.load(embeddings, mmap_mode='r', allow_pickle=False)
+        embeddings_hash = content_hash(embeddings)
+    
+    # Check if results are ready (this machine's estimator first)
+    backends = [inertia_backend()] + [b for b in ("gpu", "cpu") if b != inertia_backend()]
+    cache_files = [elbow_cache_file(embeddings_hash, b) for b in backends]
+    cache_files = [f for f in cache_files if os.path.exists(f)]
+    if not cache_files:
+        print(f"❌ Elbow results for embeddings {embeddings_hash} not found. Run the elbow analysis first.")
         return
+    print(f"🔎 Using elbow inertias '{cache_files[0]}'")
+    with np.load(cache_files[0]) as results:
+        k_values, inertias = results['k_values'], results['inertias']
+    print(f"✅ Loaded precise elbow results: {len(k_values)} k values tested")
     
     # Find the optimal k using KneeLocator
     kneedle = KneeLocator(k_values, inertias, curve="convex", direction="decreasing")
@@ -105,4 +123,7 @@ def analyze_elbow_results():
     return optimal_k, k_values, inertias
 
 if __name__ == "__main__":
-    analyze_elbow_results() 
\ No newline at end of file
+    if len(sys.argv) < 2:
+        print("Usage: python analyze_elbow.py <embeddings.npy | embeddings hash>")
+        sys.exit(1)
+    analyze_elbow_results(sys.argv[1])
@@ -169,9 +169,13 @@ def test_gpu_components():
         print(f"❌ GPU clustering failed: {e}")
 
 if __name__ == "__main__":
+    import logging
     import sys
     import numpy as np
     
+    # Show the projection module's progress messages the way print() did
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     if len(sys.argv) > 1:
         mode = sys.argv[1]
         if mode == "data":
@@ -133,9 +133,12 @@ def clean_cache_files():
     cache_patterns = [
         "embeddings_*.npy",
         "cluster_labels_*.npy", 
-        "elbow_search_*.npy",
-        "*umap_2d_embeddings_*.npy",
-        "tsne_2d_embeddings_*.npy"
+        "elbow_k*.npz",
+        "*umap_2d_embeddings_*.npz",
+        "tsne_2d_embeddings_*.npz",
+        "knn_*.npz",
+        "graph_csr_*.npz",
+        "umap_reducer_*.joblib"
     ]
     
     import glob
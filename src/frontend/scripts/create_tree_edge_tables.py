@@ -286,8 +286,15 @@ def compute_topological_levels():
         cursor = conn.cursor()
         cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN topo_level INTEGER DEFAULT 0")
         
-        level_updates = [(level, node_id) for node_id, level in levels.items()]
-        cursor.executemany(f"UPDATE {TABLE_NAME} SET topo_level = ? WHERE paper_id = ?", level_updates)
+        # Stage levels in a temp table, then apply them with one UPDATE ... FROM
+        cursor.execute("DROP TABLE IF EXISTS temp.level_updates")
+        cursor.execute("CREATE TEMP TABLE level_updates(paper_id TEXT PRIMARY KEY, lvl INTEGER) WITHOUT ROWID")
+        cursor.executemany("INSERT INTO level_updates VALUES (?, ?)", levels.items())
+        cursor.execute(f"""
+            UPDATE {TABLE_NAME} SET topo_level = level_updates.lvl
+            FROM level_updates WHERE {TABLE_NAME}.paper_id = level_updates.paper_id
+        """)
+        cursor.execute("DROP TABLE level_updates")
         
         # Create index
         cursor.execute(f"CREATE INDEX idx_topo_level ON {TABLE_NAME}(topo_level)")